@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.model_selection import KFold
+
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+from src.processing.format.data_wrapper_executor import ExecutorSettings
+from src.processing.format.data_wrapper_operations import WrapperOperations
+from src.processing.format.data_wrapper_pipeline import Pipeline
+
+
+class CrossValidation:
+    """ Cross-validation of a model fitted on preprocessed signals.
+
+    Preprocessor methods work on every signal separately, so their results do not depend on the split: the leading
+    sample-independent steps are computed once for the whole dataset. Steps which calculate settings from the rows of
+    the fold (declared with data_interface <fit>, eg. MSC reference) are refitted on the training rows of every split
+    and applied to both its training and test rows, as are all the steps following them. Scaling belongs to the model
+    (eg. sklearn.pipeline.make_pipeline(StandardScaler(), PLSRegression())), which is cloned and fitted per split.
+    Splits are evaluated in parallel.
+
+    Preprocessed splits are kept, so the model can be evaluated many times without any preprocessing, eg. for
+    the calibration curve.
+
+    Example:
+        validation = CrossValidation(
+            steps=[
+                (Preprocessor.filter.sav_gol, {"window_size": 15}),
+                (Preprocessor.baseline.als_optimized, {"lam": 10**5}),
+                Preprocessor.normalize.msc,
+            ],
+            splitter=KFold(n_splits=5, shuffle=True, random_state=0),
+        )
+        validation.prepare(data=nested_dataset, target="Wine type")
+        scores = [validation.evaluate(make_pipeline(StandardScaler(), PLSRegression(n)))["score"]
+                  for n in range(1, 21)]
+        GraphsModel.calibration_curve(list(range(1, 21)), scores)
+    """
+
+    def __init__(
+            self,
+            steps: list = (),
+            splitter=None,
+            scoring=None
+    ):
+        """
+        Args:
+            steps (list): Preprocessing steps, see Pipeline. Steps refitted per split are called on signals only
+                (instruction of Y type), methods requiring x-axis have to precede them.
+            splitter: sklearn splitter (eg. KFold, StratifiedKFold), defaults to KFold(n_splits=5).
+            scoring: Function scoring (y_true, y_pred), defaults to RMSE for numeric targets and accuracy for others.
+        """
+        self.steps = list(steps)
+        # Steps are checked before any processing
+        pipeline = Pipeline(self.steps)
+        self.split_step = next(
+            (idx for idx, (function, _, kwargs) in enumerate(pipeline.steps)
+             if any(kwargs.get(key) is None for key in getattr(function, "fit", {}))),
+            len(self.steps))
+        self.split_steps = [(function, kwargs) for function, _, kwargs in pipeline.steps[self.split_step:]]
+        self.splitter = splitter if splitter is not None else KFold(n_splits=5)
+        self.scoring = scoring
+        self.splits_ = []
+        self.target_ = None
+
+    def __call__(
+            self,
+            data: dict,
+            model,
+            target: str,
+            label: str = DataFoldsConstants.spectro.ftir.constants.Y_SPECTRUM,
+            groups: np.ndarray = None,
+            workers: int = None,
+            executor: str = None
+    ) -> pd.Series:
+        """ Preprocesses the dataset and evaluates the model, see prepare and evaluate.
+        """
+        self.prepare(data=data, target=target, label=label, groups=groups, workers=workers, executor=executor)
+        return self.evaluate(model=model, workers=workers, executor=executor)
+
+    def prepare(
+            self,
+            data: dict,
+            target: str,
+            label: str = DataFoldsConstants.spectro.ftir.constants.Y_SPECTRUM,
+            groups: np.ndarray = None,
+            workers: int = None,
+            executor: str = None
+    ):
+        """ Computes sample-independent steps once, then split-dependent steps for every split.
+
+        Args:
+            data (dict): Dataset package in Preprocessor format, rows of all the folds are used.
+            target (str): Column of the predicted values.
+            label (str): Column of the signals.
+            groups (np.ndarray): Group labels of the rows, passed to the splitter (eg. GroupKFold).
+            workers (int): Number of workers, defaults to global ExecutorSettings.
+            executor (str): "process" or "thread" pool, defaults to global ExecutorSettings.
+        """
+        if self.split_step:
+            data = Pipeline(self.steps[:self.split_step])(
+                data=data, copy_on_write=True, workers=workers, executor=executor)
+        block = np.concatenate([np.atleast_2d(WrapperOperations.as_block(fold_data.get(label)))
+                                for fold_data in data.values()])
+        self.target_ = np.concatenate([np.asarray(list(fold_data.get(target))) for fold_data in data.values()])
+
+        self.splits_ = []
+        for train, test in self.splitter.split(block, self.target_, groups):
+            block_train, block_test = block[train], block[test]
+            for function, kwargs in self.split_steps:
+                # Settings not passed by the user are calculated from the training rows
+                fitted = {key: fit(block_train) for key, fit in function.fit.items() if kwargs.get(key) is None}
+                method = getattr(function, "__wrapped__", function)
+                block_train = method(**{**kwargs, **fitted, "y": block_train})
+                block_test = method(**{**kwargs, **fitted, "y": block_test})
+            self.splits_.append((train, test, block_train, block_test))
+
+    def evaluate(
+            self,
+            model,
+            workers: int = None,
+            executor: str = None
+    ) -> pd.Series:
+        """ Fits the model on every prepared split and scores predictions of its test rows.
+
+        Args:
+            model: sklearn estimator (or sklearn pipeline with scaling), cloned for every split.
+            workers (int): Number of workers, defaults to global ExecutorSettings.
+            executor (str): "process" or "thread" pool, defaults to global ExecutorSettings.
+
+        Returns:
+            (pd.Series): Scores of the splits, named "split <idx>", and "score" of all the out-of-fold predictions
+                (eg. RMSECV). Out-of-fold predictions are stored in <predictions_>.
+        """
+        if not self.splits_:
+            raise ValueError("Dataset has to be prepared before the model evaluation.")
+        if workers is None:
+            workers = ExecutorSettings.workers
+        if executor is None:
+            executor = ExecutorSettings.executor
+        scoring = self.scoring if self.scoring is not None else _get_default_scoring(self.target_)
+        jobs = [(clone(model), block_train, self.target_[train], block_test)
+                for train, _, block_train, block_test in self.splits_]
+
+        if workers is None or workers <= 1:
+            predictions = [_fit_predict(*job) for job in jobs]
+        else:
+            ExecutorSettings.check(executor)
+            with ExecutorSettings.EXECUTORS_AVAILABLE.get(executor)(max_workers=workers) as pool:
+                futures = [pool.submit(_fit_predict, *job) for job in jobs]
+                predictions = [future.result() for future in futures]
+
+        scores = {}
+        self.predictions_ = None
+        for idx, ((_, test, _, _), prediction) in enumerate(zip(self.splits_, predictions)):
+            if self.predictions_ is None:
+                self.predictions_ = np.empty((len(self.target_),) + prediction.shape[1:], dtype=prediction.dtype)
+            self.predictions_[test] = prediction
+            scores.update({f"split {idx}": scoring(self.target_[test], prediction)})
+        # Rows not tested by the splitter (eg. TimeSeriesSplit) are left out of the overall score
+        tested = np.unique(np.concatenate([test for _, test, _, _ in self.splits_]))
+        scores.update({"score": scoring(self.target_[tested], self.predictions_[tested])})
+        return pd.Series(scores)
+
+
+def _fit_predict(
+        model,
+        block_train: np.ndarray,
+        target_train: np.ndarray,
+        block_test: np.ndarray
+) -> np.ndarray:
+    """ Fits the model on the training rows and returns predictions of the test rows.
+    """
+    model.fit(block_train, target_train)
+    prediction = np.asarray(model.predict(block_test))
+    # Single target regressors (eg. PLSRegression) return (n_samples, 1) block
+    return prediction.reshape(len(block_test), -1)[:, 0] if np.ndim(target_train) == 1 else prediction
+
+
+def _get_default_scoring(target: np.ndarray):
+    """ Returns RMSE for numeric targets, accuracy otherwise.
+    """
+    if target.dtype.kind in "biuf":
+        return _rmse
+    return accuracy_score
+
+
+def _rmse(
+        y_true: np.ndarray,
+        y_pred: np.ndarray
+) -> float:
+    return float(np.sqrt(mean_squared_error(y_true, y_pred)))
@@ -0,0 +1,445 @@
+import itertools
+import warnings
+
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from scipy.stats import norm
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import Matern
+
+from src.graphs.constants.config_baseline import ConfigBaseline
+from src.graphs.constants.constants import JupyterWidgetsConstants
+from src.processing.evaluation.evaluation_cross_validation import CrossValidation
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+from src.processing.format.data_wrapper_executor import ExecutorSettings
+from src.processing.format.data_wrapper_operations import WrapperOperations
+from src.processing.format.data_wrapper_pipeline import Pipeline
+
+# Random candidates scored by the acquisition function per bayesian search round, if the grid is larger
+_CANDIDATES_MAX = 5000
+# Sweep data of the running pools (set by the pool initializer), keyed by the sweep token
+_WORKER_DATA = {}
+_TOKENS = itertools.count()
+
+
+class ParameterSweep:
+    """ Search of method settings scored on the processed signals.
+
+    Settings are taken from the grid of every swept kwarg, by default built from the ranges of the widget
+    configuration (ConfigBaseline.CONFIGURATIONS), and evaluated on a process (or thread) pool:
+        "grid" - all the grid points,
+        "random" - <n_iter> random grid points,
+        "bayesian" - <n_iter> grid points proposed in rounds by expected improvement of a gaussian process fitted
+            to the scores of the previous rounds.
+    If <subset> is set, the search is done on a random subset of signals and only the best <keep> fraction of settings
+    is scored on all of them. Signals are sent to every worker once. Settings sharing the kwargs for which the method
+    keeps lru-cached data (eg. ALS penalty band for <lam>) are evaluated by the same worker, so the cache is reused.
+
+    Example:
+        sweep = ParameterSweep(
+            method=Preprocessor.baseline.als_optimized,
+            scoring=CrossValidationScore(make_pipeline(StandardScaler(), PLSRegression(5))),
+            parameters=("lam", "p"),
+            search="bayesian", n_iter=100, subset=0.2
+        )
+        results = sweep(data=nested_dataset, target="Measured 16-OMC + 16-OMK content from 3.16ppm peak (mg/kg)",
+                        workers=4, executor="process")
+    """
+    # Kwargs defining the data cached by the methods (penalty bands, polynomial bases), see Baseline
+    _SHARED_KWARGS = {
+        "als_optimized": ("lam",),
+        "als_segmented": ("lam",),
+        "improved_mod_poly": ("polynomial_degree",),
+    }
+    _SEARCH_AVAILABLE = [
+        "grid",
+        "random",
+        "bayesian",
+    ]
+    _SLIDERS = [
+        JupyterWidgetsConstants.INT_SLIDER,
+        JupyterWidgetsConstants.FLOAT_SLIDER,
+        JupyterWidgetsConstants.FLOAT_LOG_SLIDER,
+    ]
+
+    def __init__(
+            self,
+            method,
+            scoring,
+            space: dict = None,
+            parameters: tuple = None,
+            kwargs: dict = None,
+            search: str = _SEARCH_AVAILABLE[0],
+            n_iter: int = 50,
+            subset: float = None,
+            keep: float = 0.25,
+            greater_is_better: bool = False,
+            random_state: int = 0
+    ):
+        """
+        Args:
+            method: Method declared with data_interface wrapper, called on (n_samples, n_points) block.
+            scoring: Picklable function scoring (processed_block, target) with a single number, eg. module-level
+                function or CrossValidationScore. Target is None, if target column is not passed.
+            space (dict): Swept kwargs and their values, sequence or widget configuration
+                (eg. CW.get_config_slider_int). Defaults to the method configuration of ConfigBaseline.CONFIGURATIONS.
+            parameters (tuple): Swept kwargs of the space, defaults to all the sliders.
+            kwargs (dict): Method kwargs kept constant.
+            search (str): Search strategy, "grid", "random" or "bayesian".
+            n_iter (int): Number of settings evaluated by random and bayesian search.
+            subset (float): Fraction of signals used to search and prune settings, all the signals if not set.
+            keep (float): Fraction of the best settings scored on all the signals, if <subset> is set.
+            greater_is_better (bool): Whether the score is maximized.
+            random_state (int): Seed of the subset, random and bayesian search.
+        """
+        if not hasattr(method, "__wrapped__"):
+            raise ValueError(f"Method <{method}> is not declared with data_interface wrapper.")
+        if search not in self._SEARCH_AVAILABLE:
+            raise ValueError(f"Search <{search}> not available, choose from {self._SEARCH_AVAILABLE}.")
+        if space is None:
+            space = ConfigBaseline.CONFIGURATIONS.get(method.__name__)
+            if space is None:
+                raise ValueError(f"Method <{method.__name__}> has no configuration, pass the <space>.")
+        if parameters is None:
+            parameters = [key for key, values in space.items() if self._is_slider(values)]
+
+        self.method = method
+        self.scoring = scoring
+        self.space = {key: self.get_values(space.get(key)) for key in parameters}
+        self.kwargs = dict(kwargs or {})
+        # Settings are checked before any processing
+        WrapperOperations.is_key_in_kwargs(
+            default_kv=WrapperOperations.get_function_default_arguments(method.__wrapped__),
+            **self.space, **self.kwargs)
+        self.search = search
+        self.n_iter = n_iter
+        self.subset = subset
+        self.keep = keep
+        self.greater_is_better = greater_is_better
+        self.random_state = random_state
+        self.results_ = pd.DataFrame()
+
+    def __call__(
+            self,
+            data: dict,
+            label: str = DataFoldsConstants.spectro.ftir.constants.Y_SPECTRUM,
+            target: str = None,
+            steps: list = (),
+            workers: int = None,
+            executor: str = None
+    ) -> pd.DataFrame:
+        """ Runs the search and returns the results table.
+
+        Args:
+            data (dict): Dataset package in Preprocessor format, rows of all the folds are used.
+            label (str): Column of the signals.
+            target (str): Column passed to the scoring function (eg. reference values for the calibration).
+            steps (list): Pipeline steps computed once before the sweep (eg. filter).
+            workers (int): Number of workers, defaults to global ExecutorSettings.
+            executor (str): "process" or "thread" pool, defaults to global ExecutorSettings.
+
+        Returns:
+            (pd.DataFrame): Row per evaluated setting, best first: swept kwargs, "score subset" (if <subset> is set)
+                and "score" (NaN for pruned settings).
+        """
+        if workers is None:
+            workers = ExecutorSettings.workers
+        if executor is None:
+            executor = ExecutorSettings.executor
+        if steps:
+            data = Pipeline(steps)(data=data, copy_on_write=True, workers=workers, executor=executor)
+        block = np.concatenate([np.atleast_2d(WrapperOperations.as_block(fold_data.get(label)))
+                                for fold_data in data.values()])
+        values = None if target is None else np.concatenate(
+            [np.asarray(list(fold_data.get(target))) for fold_data in data.values()])
+
+        random = np.random.default_rng(self.random_state)
+        block_search, values_search = block, values
+        if self.subset is not None:
+            rows = np.sort(random.choice(len(block), max(1, int(round(self.subset * len(block)))), replace=False))
+            block_search, values_search = block[rows], None if values is None else values[rows]
+
+        # A single pool for the whole search, signals are sent to every worker once
+        with self._open_workers(block_search, values_search, workers, executor) as run_tasks:
+            def evaluate(points: list) -> np.ndarray:
+                return self._score(points, run_tasks, workers)
+
+            if self.search == "grid":
+                points = list(itertools.product(*[range(len(grid)) for grid in self.space.values()]))
+                scores = evaluate(points)
+            elif self.search == "random":
+                points = self._sample_points(random, self.n_iter, exclude=set())
+                scores = evaluate(points)
+            else:
+                points, scores = self._search_bayesian(random, evaluate, batch_size=max(workers or 1, 1))
+
+        results = pd.DataFrame(
+            [{key: grid[idx] for (key, grid), idx in zip(self.space.items(), point)} for point in points])
+        if self.subset is None:
+            results["score"] = scores
+        else:
+            results["score subset"] = scores
+            results["score"] = np.nan
+            # Settings are pruned on the subset, the best ones are scored on all the signals
+            best = np.argsort(self._get_loss(scores), kind="stable")[:max(1, int(np.ceil(self.keep * len(points))))]
+            results.loc[best, "score"] = self.evaluate(
+                [points[idx] for idx in best], block, values, workers=workers, executor=executor)
+
+        # Sorted by the score on all the signals, then by the subset score
+        order = np.lexsort([self._get_loss(results[column].to_numpy()) for column in results.columns
+                            if column.startswith("score")])
+        self.results_ = results.iloc[order].reset_index(drop=True)
+        return self.results_
+
+    def evaluate(
+            self,
+            points: list,
+            block: np.ndarray,
+            target: np.ndarray = None,
+            workers: int = None,
+            executor: str = None
+    ) -> np.ndarray:
+        """ Scores the settings, in parallel if workers are set.
+
+        Args:
+            points (list): Settings as tuples of grid indices of the swept kwargs.
+            block (np.ndarray): (n_samples, n_points) block of signals.
+            target (np.ndarray): Values passed to the scoring function.
+
+        Returns:
+            (np.ndarray): Scores of the settings.
+        """
+        if workers is None:
+            workers = ExecutorSettings.workers
+        if executor is None:
+            executor = ExecutorSettings.executor
+        with self._open_workers(block, target, workers, executor) as run_tasks:
+            return self._score(points, run_tasks, workers)
+
+    @contextmanager
+    def _open_workers(
+            self,
+            block: np.ndarray,
+            target: np.ndarray,
+            workers: int,
+            executor: str
+    ):
+        """ Starts workers holding the signals and yields function running tasks (lists of settings) on them.
+
+        Signals, target and method settings are passed to every worker once, with the pool initializer, tasks carry
+        only the settings.
+        """
+        token = next(_TOKENS)
+        worker_data = (token, self.method, block, target, self.kwargs, self.scoring)
+        _set_worker_data(*worker_data)
+        try:
+            if workers is None or workers <= 1:
+                yield lambda tasks: [_score_settings(token, task) for task in tasks]
+            else:
+                ExecutorSettings.check(executor)
+                with ExecutorSettings.EXECUTORS_AVAILABLE.get(executor)(
+                        max_workers=workers, initializer=_set_worker_data, initargs=worker_data) as pool:
+                    yield lambda tasks: [future.result()
+                                         for future in [pool.submit(_score_settings, token, task) for task in tasks]]
+        finally:
+            _WORKER_DATA.pop(token, None)
+
+    def _score(
+            self,
+            points: list,
+            run_tasks,
+            workers: int
+    ) -> np.ndarray:
+        """ Splits the settings into tasks and returns their scores.
+        """
+        settings = [{key: grid[idx] for (key, grid), idx in zip(self.space.items(), point)} for point in points]
+        # Settings sharing the lru-cached data of the method (eg. ALS penalty band) are evaluated one after another
+        # by the same worker. Factorisations depend on the signal weights, they are not shared between settings
+        shared = [key for key in self._SHARED_KWARGS.get(self.method.__name__, ()) if key in self.space]
+        groups = {}
+        for idx, setting in enumerate(settings):
+            groups.setdefault(tuple(repr(setting.get(key)) for key in shared), []).append(idx)
+        chunk_size = int(np.ceil(len(settings) / max(2 * (workers or 1), 1)))
+        tasks = [indices[start:start + chunk_size]
+                 for indices in groups.values() for start in range(0, len(indices), chunk_size)]
+        results = run_tasks([[settings[idx] for idx in task] for task in tasks])
+
+        scores = np.empty(len(settings))
+        for task, task_scores in zip(tasks, results):
+            scores[task] = task_scores
+        return scores
+
+    @staticmethod
+    def get_values(configuration) -> list:
+        """ Returns values of the widget configuration (slider points or dropdown options), other sequences as list.
+        """
+        if not ParameterSweep._is_widget(configuration):
+            return list(configuration)
+        settings, widget_type = configuration[JupyterWidgetsConstants.WIDGET_CONFIGURATION], configuration[
+            JupyterWidgetsConstants.WIDGET_TYPE]
+        if widget_type == JupyterWidgetsConstants.DROPDOWN:
+            return list(settings.get("options"))
+        if widget_type == JupyterWidgetsConstants.CHECKBOX:
+            return [False, True]
+        if widget_type not in ParameterSweep._SLIDERS:
+            raise ValueError(f"Widget type <{widget_type}> can not be swept, pass the values.")
+
+        minimum, maximum, step = settings.get("min"), settings.get("max"), settings.get("step")
+        # Slider points, rounded to the step precision (floating point steps accumulate errors)
+        points = np.round(minimum + step * np.arange(int(round((maximum - minimum) / step)) + 1), 10)
+        if widget_type == JupyterWidgetsConstants.INT_SLIDER:
+            return [int(point) for point in points]
+        if widget_type == JupyterWidgetsConstants.FLOAT_LOG_SLIDER:
+            return [float(settings.get("base") ** point) for point in points]
+        return [float(point) for point in points]
+
+    @staticmethod
+    def _is_widget(configuration) -> bool:
+        return (
+            isinstance(configuration, list) and len(configuration) == 2
+            and isinstance(configuration[JupyterWidgetsConstants.WIDGET_CONFIGURATION], dict)
+        )
+
+    @staticmethod
+    def _is_slider(configuration) -> bool:
+        return not ParameterSweep._is_widget(configuration) \
+            or configuration[JupyterWidgetsConstants.WIDGET_TYPE] in ParameterSweep._SLIDERS
+
+    def _get_loss(self, scores: np.ndarray) -> np.ndarray:
+        """ Returns minimized form of the scores, not finite scores are the worst.
+        """
+        loss = -np.asarray(scores, dtype=float) if self.greater_is_better else np.asarray(scores, dtype=float)
+        return np.where(np.isfinite(loss), loss, np.inf)
+
+    def _sample_points(
+            self,
+            random: np.random.Generator,
+            count: int,
+            exclude: set
+    ) -> list:
+        """ Returns distinct random grid points, not included in <exclude>.
+        """
+        sizes = [len(grid) for grid in self.space.values()]
+        count = min(count, int(np.prod(sizes, dtype=float)) - len(exclude))
+        points = []
+        while len(points) < count:
+            # Grid is not materialized, points are drawn per kwarg
+            for point in map(tuple, random.integers(0, sizes, size=(2 * (count - len(points)), len(sizes)))):
+                if point not in exclude and len(points) < count:
+                    exclude.add(point)
+                    points.append(point)
+        return points
+
+    def _search_bayesian(
+            self,
+            random: np.random.Generator,
+            evaluate,
+            batch_size: int
+    ) -> (list, np.ndarray):
+        """ Evaluates random initial settings, then rounds of settings with the highest expected improvement.
+        """
+        sizes = np.array([len(grid) for grid in self.space.values()])
+        evaluated = set()
+        points = self._sample_points(random, min(self.n_iter, max(5, batch_size)), exclude=evaluated)
+        scores = list(evaluate(points))
+
+        while len(points) < self.n_iter:
+            if np.prod(sizes, dtype=float) <= _CANDIDATES_MAX:
+                candidates = [point for point in itertools.product(*map(range, sizes)) if point not in evaluated]
+            else:
+                candidates = self._sample_points(random, _CANDIDATES_MAX, exclude=set(evaluated))
+            if not candidates:
+                break
+
+            # Grid indices scaled to unit cube (log sliders are evenly spaced in exponent)
+            scale = np.maximum(sizes - 1, 1)
+            coordinates = np.array(points) / scale
+            loss = self._get_loss(scores)
+            loss = np.where(np.isfinite(loss), loss, np.max(loss[np.isfinite(loss)], initial=0))
+            candidates_coordinates = np.array(candidates) / scale
+            batch = []
+            for _ in range(min(batch_size, self.n_iter - len(points), len(candidates))):
+                # Scores are deterministic, only a small jitter is added to the kernel diagonal
+                model = GaussianProcessRegressor(
+                    kernel=Matern(length_scale_bounds=(1 / scale.max(), 10), nu=2.5), alpha=1e-6, normalize_y=True,
+                    random_state=self.random_state)
+                with warnings.catch_warnings():
+                    # Kernel bounds are reached on flat or very rough score surfaces, the fit is still usable
+                    warnings.simplefilter("ignore", ConvergenceWarning)
+                    model.fit(coordinates, loss)
+                mean, deviation = model.predict(candidates_coordinates, return_std=True)
+                deviation = np.maximum(deviation, 1e-12)
+                improvement = loss.min() - mean
+                expected_improvement = improvement * norm.cdf(improvement / deviation) \
+                    + deviation * norm.pdf(improvement / deviation)
+                best = int(np.argmax(expected_improvement))
+                batch.append(candidates.pop(best))
+                # Proposed setting is assumed to score the predicted mean, the next one is proposed elsewhere
+                coordinates = np.vstack([coordinates, candidates_coordinates[best]])
+                loss = np.append(loss, mean[best])
+                candidates_coordinates = np.delete(candidates_coordinates, best, axis=0)
+
+            evaluated.update(batch)
+            points.extend(batch)
+            scores.extend(evaluate(batch))
+        return points, np.asarray(scores, dtype=float)
+
+
+class CrossValidationScore:
+    """ Scoring function of ParameterSweep, cross-validated score of the model fitted on the processed signals.
+    """
+
+    def __init__(
+            self,
+            model,
+            splitter=None,
+            scoring=None
+    ):
+        """
+        Args:
+            model: sklearn estimator (or sklearn pipeline with scaling), see CrossValidation.
+            splitter: sklearn splitter, defaults to KFold(n_splits=5).
+            scoring: Function scoring (y_true, y_pred), see CrossValidation.
+        """
+        self.model = model
+        self.splitter = splitter
+        self.scoring = scoring
+
+    def __call__(
+            self,
+            block: np.ndarray,
+            target: np.ndarray
+    ) -> float:
+        label = DataFoldsConstants.spectro.ftir.constants.Y_SPECTRUM
+        validation = CrossValidation(splitter=self.splitter, scoring=self.scoring)
+        validation.prepare(data={"sweep": {label: block, "target": target}}, target="target", label=label)
+        # Splits are already evaluated in parallel by the sweep
+        return validation.evaluate(model=self.model, workers=1)["score"]
+
+
+def _set_worker_data(
+        token: int,
+        method,
+        block: np.ndarray,
+        target: np.ndarray,
+        kwargs: dict,
+        scoring
+) -> None:
+    """ Stores the sweep data in the worker (pool initializer), threads of the pool share it.
+    """
+    _WORKER_DATA[token] = (method, block, target, kwargs, scoring)
+
+
+def _score_settings(
+        token: int,
+        settings: list
+) -> list:
+    """ Processes the block stored in the worker with every setting and returns the scores.
+    """
+    method, block, target, kwargs, scoring = _WORKER_DATA.get(token)
+    function = getattr(method, "__wrapped__", method)
+    return [float(scoring(function(**{**kwargs, **setting, "y": block}), target)) for setting in settings]
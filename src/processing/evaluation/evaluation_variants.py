@@ -0,0 +1,212 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from sklearn.utils.extmath import randomized_svd
+
+from src.processing.format.data_wrapper_cache import get_value_digest
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+from src.processing.format.data_wrapper_executor import ExecutorSettings
+from src.processing.format.data_wrapper_operations import WrapperOperations
+from src.processing.format.data_wrapper_pipeline import Pipeline
+
+# Blocks with a dimension up to this size are decomposed through the Gram matrix
+_GRAM_MAX_SIZE = 2048
+
+
+class VariantComparison:
+    """ Comparison of preprocessing variants by PCA explained variance.
+
+    Every variant is a sequence of Pipeline steps. Variants are computed once, steps shared by the beginnings of
+    several variants (eg. the same filter followed by different baselines) are computed only once as well.
+    Explained variance curves of all the variants are calculated in parallel, with randomized truncated SVD for large
+    blocks.
+
+    Example:
+        comparison = VariantComparison({
+            "Raw": [],
+            "Norm. Min-Max": [Preprocessor.normalize.min_max],
+            "Norm. SNV": [Preprocessor.normalize.snv],
+            "Baseline Removal": [(Preprocessor.baseline.als_optimized, {"lam": 10**5})],
+            "2nd Deriv. Sav-Gol": [(Preprocessor.filter.sav_gol, {"window_size": 15, "derivative": 2})],
+        })
+        summary = comparison(data=nested_dataset, workers=4, executor="thread")
+    """
+
+    def __init__(
+            self,
+            variants: dict,
+            n_components: int = 20,
+            scale: bool = True,
+            components_reported: tuple = (2, 3, 5),
+            variance_required: tuple = (0.95, 0.99),
+            random_state: int = 0
+    ):
+        """
+        Args:
+            variants (dict): Variant name and Pipeline steps pairs, empty sequence for the raw data.
+            n_components (int): Number of PCA components.
+            scale (bool): Standardize features before PCA (as StandardScaler does).
+            components_reported (tuple): Numbers of components, for which the cumulative variance is reported.
+            variance_required (tuple): Cumulative variance levels, for which the number of components is reported.
+            random_state (int): Seed of randomized SVD.
+        """
+        # Steps are checked before any processing
+        for steps in variants.values():
+            Pipeline(steps)
+        self.variants = {name: list(steps) for name, steps in variants.items()}
+        self.n_components = n_components
+        self.scale = scale
+        self.components_reported = components_reported
+        self.variance_required = variance_required
+        self.random_state = random_state
+        self.explained_variance_ratio_ = {}
+
+    def __call__(
+            self,
+            data: dict,
+            label: str = DataFoldsConstants.spectro.ftir.constants.Y_SPECTRUM,
+            workers: int = None,
+            executor: str = None
+    ) -> pd.DataFrame:
+        """ Computes variants and returns the summary table.
+
+        Args:
+            data (dict): Dataset package in Preprocessor format, rows of all the folds are used.
+            label (str): Column of the signals.
+            workers (int): Number of workers, defaults to global ExecutorSettings.
+            executor (str): "process" or "thread" pool, defaults to global ExecutorSettings.
+
+        Returns:
+            (pd.DataFrame): Row per variant, cumulative variance for the reported numbers of components and
+                numbers of components required for the variance levels (NaN if not reached with n_components).
+        """
+        datasets = self.compute_variants(data=data, workers=workers, executor=executor)
+        blocks = {
+            name: np.concatenate([np.atleast_2d(WrapperOperations.as_block(fold_data.get(label)))
+                                  for fold_data in dataset.values()])
+            for name, dataset in datasets.items()
+        }
+        del datasets
+        self.explained_variance_ratio_ = self.explained_variance(blocks=blocks, workers=workers, executor=executor)
+        return self.get_summary()
+
+    def compute_variants(
+            self,
+            data: dict,
+            workers: int = None,
+            executor: str = None
+    ) -> dict:
+        """ Processes the dataset with every variant.
+
+        Variants are split at the steps shared with other variants, the shared parts are computed once and their
+        results are reused. Passed dataset is not modified.
+
+        Returns:
+            (dict): Variant name and processed dataset pairs.
+        """
+        keys = {name: [_get_step_key(step) for step in steps] for name, steps in self.variants.items()}
+        prefix_counts = Counter(
+            tuple(steps_keys[:stop]) for steps_keys in keys.values() for stop in range(1, len(steps_keys) + 1))
+        computed = {(): data}
+
+        datasets = {}
+        for name, steps in self.variants.items():
+            steps_keys = keys.get(name)
+            start = max(stop for stop in range(len(steps) + 1) if tuple(steps_keys[:stop]) in computed)
+            dataset = computed.get(tuple(steps_keys[:start]))
+            while start < len(steps):
+                # Run fused steps up to the next prefix shared with other variants
+                stop = next(
+                    (stop for stop in range(start + 1, len(steps)) if prefix_counts[tuple(steps_keys[:stop])] > 1),
+                    len(steps))
+                dataset = Pipeline(steps[start:stop])(
+                    data=dataset, copy_on_write=True, workers=workers, executor=executor)
+                computed.update({tuple(steps_keys[:stop]): dataset})
+                start = stop
+            datasets.update({name: dataset})
+        return datasets
+
+    def explained_variance(
+            self,
+            blocks: dict,
+            workers: int = None,
+            executor: str = None
+    ) -> dict:
+        """ Calculates PCA explained variance ratio of every variant block, in parallel if workers are set.
+
+        Args:
+            blocks (dict): Variant name and (n_samples, n_points) block pairs.
+
+        Returns:
+            (dict): Variant name and explained variance ratio (n_components,) pairs.
+        """
+        if workers is None:
+            workers = ExecutorSettings.workers
+        if executor is None:
+            executor = ExecutorSettings.executor
+        settings = {"n_components": self.n_components, "scale": self.scale, "random_state": self.random_state}
+
+        if workers is None or workers <= 1:
+            return {name: _explained_variance_ratio(block, **settings) for name, block in blocks.items()}
+        ExecutorSettings.check(executor)
+        with ExecutorSettings.EXECUTORS_AVAILABLE.get(executor)(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(_explained_variance_ratio, block, **settings) for name, block in blocks.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    def get_summary(self) -> pd.DataFrame:
+        """ Returns summary table of the last comparison.
+        """
+        summary = {}
+        for name, ratio in self.explained_variance_ratio_.items():
+            cumulative = np.cumsum(ratio)
+            row = {
+                f"Cum. Var. for {components} PCA Comp.":
+                    cumulative[components - 1] if components <= len(cumulative) else np.nan
+                for components in self.components_reported
+            }
+            for variance in self.variance_required:
+                is_reached = cumulative >= variance
+                row.update({
+                    f"Components no. for {variance:.0%}": np.argmax(is_reached) + 1 if is_reached.any() else np.nan
+                })
+            summary.update({name: row})
+        return pd.DataFrame.from_dict(summary, orient="index")
+
+
+def _get_step_key(step) -> tuple:
+    """ Returns hashable description of the Pipeline step, used to find steps shared by the variants.
+    """
+    function, kwargs = step if isinstance(step, tuple) else (step, {})
+    return function.__module__, function.__qualname__, get_value_digest(kwargs)
+
+
+def _explained_variance_ratio(
+        block: np.ndarray,
+        n_components: int,
+        scale: bool,
+        random_state: int
+) -> np.ndarray:
+    """ PCA explained variance ratio of the first components.
+
+    Narrow (or short) blocks are decomposed exactly through eigenvalues of the small Gram matrix, a single
+    matrix product over the block. Randomized truncated SVD is used if both block dimensions are large.
+    """
+    block = np.asarray(block, dtype=float)
+    block = block - block.mean(axis=0)
+    if scale:
+        deviation = block.std(axis=0)
+        block /= np.where(deviation == 0, 1.0, deviation)
+    total_variance = np.einsum("ij,ij->", block, block)
+    n_components = min(n_components, *block.shape)
+
+    if min(block.shape) <= _GRAM_MAX_SIZE:
+        gram = block.T @ block if block.shape[1] <= block.shape[0] else block @ block.T
+        variances = np.linalg.eigvalsh(gram)[::-1][:n_components]
+    else:
+        _, singular_values, _ = randomized_svd(block, n_components, random_state=random_state)
+        variances = singular_values ** 2
+    return np.clip(variances, 0, None) / total_variance
@@ -48,9 +48,18 @@ DefaultConfigYofX = PreprocessorConfiguration(
     parent_class=ConstantsIsothermalCalorimetry
 )
 
+DefaultConfigYXofX = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_unpack={"y": _CONST.Y_HEAT_FLOW, "x": _CONST.X_TIMESTAMP},
+    instruction_pack={"y": _CONST.Y_HEAT_FLOW, "x": _CONST.X_TIMESTAMP},
+    parent_class=ConstantsIsothermalCalorimetry
+)
+
 
 class ConstantsCalorimetry:
     constants: ConstantsIsothermalCalorimetry = ConstantsIsothermalCalorimetry()
     config_y: DefaultConfigY = DefaultConfigY
     config_multi_y: DefaultConfigMultipleY = DefaultConfigMultipleY
     config_y_of_x: DefaultConfigYofX = DefaultConfigYofX
+    config_yx_of_x: DefaultConfigYXofX = DefaultConfigYXofX
@@ -6,15 +6,18 @@ class ConstantsSpectroscopyFourierTransformIR(PreprocessorConstants):
 
     Y_SPECTRUM: str
     X_WAVENUMBER: str
+    Y_PEAKS: str
 
     def __init__(self):
         super().__init__()
 
         self.Y_SPECTRUM = "spectra"
         self.X_WAVENUMBER = "axis_wavenumber"
+        self.Y_PEAKS = "peaks"
 
         self.DATA_FORMAT_AVAILABLE_Y = [
-            self.Y_SPECTRUM
+            self.Y_SPECTRUM,
+            self.Y_PEAKS
         ]
 
         self.DATA_FORMAT_AVAILABLE_X = [
@@ -40,8 +43,35 @@ DefaultConfigMultipleY = PreprocessorConfiguration(
     parent_class=ConstantsSpectroscopyFourierTransformIR
 )
 
+DefaultConfigYofX = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y,
+    instruction_unpack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_WAVENUMBER},
+    instruction_pack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_WAVENUMBER},
+    parent_class=ConstantsSpectroscopyFourierTransformIR
+)
+
+DefaultConfigYXofX = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_unpack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_WAVENUMBER},
+    instruction_pack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_WAVENUMBER},
+    parent_class=ConstantsSpectroscopyFourierTransformIR
+)
+
+DefaultConfigPeaks = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y,
+    instruction_unpack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_WAVENUMBER},
+    instruction_pack={"y": _CONST.Y_PEAKS},
+    parent_class=ConstantsSpectroscopyFourierTransformIR
+)
+
 
 class ConstantsFTIR:
     constants: ConstantsSpectroscopyFourierTransformIR = ConstantsSpectroscopyFourierTransformIR()
     config_y: DefaultConfigY = DefaultConfigY
     config_multi_y: DefaultConfigMultipleY = DefaultConfigMultipleY
+    config_y_of_x: DefaultConfigYofX = DefaultConfigYofX
+    config_yx_of_x: DefaultConfigYXofX = DefaultConfigYXofX
+    config_peaks: DefaultConfigPeaks = DefaultConfigPeaks
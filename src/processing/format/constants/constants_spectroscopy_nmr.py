@@ -6,14 +6,17 @@ class ConstantsSpectroscopyNuclearMagneticResonance(PreprocessorConstants):
 
     Y_SPECTRUM: str
     X_CHEM_SHIFT: str
+    Y_PEAKS: str
 
     def __init__(self):
         super().__init__()
         self.Y_SPECTRUM = "spectra"
         self.X_CHEM_SHIFT = "axis_chem_shift"
+        self.Y_PEAKS = "peaks"
 
         self.DATA_FORMAT_AVAILABLE_Y = [
-            self.Y_SPECTRUM
+            self.Y_SPECTRUM,
+            self.Y_PEAKS
         ]
 
         self.DATA_FORMAT_AVAILABLE_X = [
@@ -39,8 +42,35 @@ DefaultConfigMultipleY = PreprocessorConfiguration(
     parent_class=ConstantsSpectroscopyNuclearMagneticResonance
 )
 
+DefaultConfigYofX = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y,
+    instruction_unpack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_CHEM_SHIFT},
+    instruction_pack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_CHEM_SHIFT},
+    parent_class=ConstantsSpectroscopyNuclearMagneticResonance
+)
+
+DefaultConfigYXofX = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_unpack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_CHEM_SHIFT},
+    instruction_pack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_CHEM_SHIFT},
+    parent_class=ConstantsSpectroscopyNuclearMagneticResonance
+)
+
+DefaultConfigPeaks = PreprocessorConfiguration(
+    instruction_type_unpack=_CONST.PROCESS_DATA_AS_Y_OF_X,
+    instruction_type_pack=_CONST.PROCESS_DATA_AS_Y,
+    instruction_unpack={"y": _CONST.Y_SPECTRUM, "x": _CONST.X_CHEM_SHIFT},
+    instruction_pack={"y": _CONST.Y_PEAKS},
+    parent_class=ConstantsSpectroscopyNuclearMagneticResonance
+)
+
 
 class ConstantsNMR:
     constants: ConstantsSpectroscopyNuclearMagneticResonance = ConstantsSpectroscopyNuclearMagneticResonance()
     config_y: DefaultConfigY = DefaultConfigY
     config_multi_y: DefaultConfigMultipleY = DefaultConfigMultipleY
+    config_y_of_x: DefaultConfigYofX = DefaultConfigYofX
+    config_yx_of_x: DefaultConfigYXofX = DefaultConfigYXofX
+    config_peaks: DefaultConfigPeaks = DefaultConfigPeaks
@@ -28,7 +28,8 @@ class PreprocessorConstants:
 
         self.DATA_FORMAT_AVAILABLE_PACK = [
             self.PROCESS_DATA_AS_Y,
-            self.PROCESS_DATA_AS_MULTIPLE_YX
+            self.PROCESS_DATA_AS_MULTIPLE_YX,
+            self.PROCESS_DATA_AS_Y_OF_X
         ]
 
         self.DATA_FORMAT_AVAILABLE_Y = []
@@ -1,6 +1,4 @@
 
-import copy
-
 from functools import wraps
 
 from src.processing.format.data_wrapper_operations import WrapperOperations
@@ -12,7 +10,11 @@ def data_interface(
         original_function=None,
         *,
         data: dict = None,
-        instruction: PreprocessorConfiguration = None
+        instruction: PreprocessorConfiguration = None,
+        batch: bool = False,
+        copy_on_write: bool = False,
+        fit: dict = None,
+        dependent_kwargs: tuple = ()
 ):
     """ Preprocessor wrapper.
 
@@ -23,7 +25,28 @@ def data_interface(
         data (dict): Passing this key as argument will run data_interface decorator. To run method independently just
             set this key as None. In this case only key vocabulary will be checked before function call.
         instruction (object): Wrapper argument. Specifies how data is unpacked/packed inside a wrapper.
-
+        batch (bool): Wrapper argument. Declares that the decorated method accepts a 2D (n_samples, n_points) block
+            and processes it along the last axis. If set, the whole fold is passed on the method in one call,
+            the per-row loop is used only when the fold rows can not be stacked into a matrix.
+        copy_on_write (bool): Wrapper argument. Default data copy mode, can be overridden on call by passing
+            the <copy_on_write> key. If set, the dataset is not deep-copied: folds are shallow copies, only the columns
+            updated by the pack instruction are newly allocated, other columns are shared with the passed dataset
+            (as read-only views).
+        fit (dict): Wrapper argument. Method settings calculated from the rows of the whole fold (eg. MSC reference),
+            {kwarg: function(y_block)}. If such setting is not passed, the method result for a row depends on other
+            rows, so it is fitted on the whole fold before the fold is split between workers, CrossValidation refits it
+            on the training rows of every split and streamed chunks require it to be passed.
+        dependent_kwargs (tuple): Wrapper argument. Method settings which, if set, make the result for a row depend
+            on other rows of the block (eg. ALS warm start from the block median). Such blocks are not split between
+            workers and can not be streamed.
+        workers (int): Call argument, pass the <workers> key to spread folds and row chunks over a pool.
+            Results are returned in the same order as in serial processing.
+        executor (str): Call argument, pool type: "process" or "thread".
+            Both keys default to global ExecutorSettings (see Preprocessor.set_execution).
+        cache (bool): Call argument, pass the <cache> key to reuse fold results stored in ResultsCache.
+            Defaults to global ResultsCache setting (see Preprocessor.set_cache).
+        stream (bool): Call argument, pass the <stream> key to process an iterable of chunks (folds or their row
+            slices) passed as <data>. A generator of processed chunks is returned, cache is not used.
 
     Returns: Processed dataset or call function without decorator.
 
@@ -42,27 +65,59 @@ def data_interface(
                 return result
             # If the data kv has been passed, execute:
             else:
-                # Separate data from method arguments
-                _data = copy.deepcopy(kwargs.pop("data"))
-
                 if "instruction" in kwargs:
                     _instruction = kwargs.pop("instruction")
                 else:
                     _instruction = instruction
 
+                if "copy_on_write" in kwargs:
+                    _copy_on_write = kwargs.pop("copy_on_write")
+                else:
+                    _copy_on_write = copy_on_write
+
+                _workers = kwargs.pop("workers", ExecutorSettings.workers)
+                _executor = kwargs.pop("executor", ExecutorSettings.executor)
+                _cache = kwargs.pop("cache", ResultsCache.enabled)
+                _stream = kwargs.pop("stream", False)
+
+                # Separate data from method arguments
+                _data = kwargs.pop("data")
+
                 WrapperOperations.is_key_in_kwargs(default_kv=default_kwargs, **kwargs)
 
                 # Update default settings
                 updated_kwargs = default_kwargs
                 updated_kwargs.update(kwargs)
 
+                if _stream:
+                    return process_stream(
+                        function=call_func,
+                        instruction=_instruction,
+                        chunks=_data,
+                        updated_kwargs=updated_kwargs,
+                        batch=batch,
+                        workers=_workers,
+                        executor=_executor
+                    )
+
+                _data = copy_folds(data=_data, copy_on_write=_copy_on_write)
+
                 return process_fold_by_fold(
-                    function=function,
+                    function=call_func,
                     instruction=_instruction,
                     data=_data,
-                    updated_kwargs=updated_kwargs
+                    updated_kwargs=updated_kwargs,
+                    batch=batch,
+                    workers=_workers,
+                    executor=_executor,
+                    cache=_cache
                 )
 
+        # Wrapper settings, used to fuse methods in Pipeline
+        call_func.instruction = instruction
+        call_func.batch = batch
+        call_func.fit = fit or {}
+        call_func.dependent_kwargs = dependent_kwargs
         return call_func
 
     if original_function:
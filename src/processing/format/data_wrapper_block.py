@@ -0,0 +1,228 @@
+import copy
+import hashlib
+import weakref
+
+import numpy as np
+
+# Shared axes of all blocks, equal axes are stored once (also in pickled datasets)
+_AXES_INTERNED = weakref.WeakValueDictionary()
+
+
+class SpectraBlock:
+    """ Compact fold container.
+
+    Signals are stored as contiguous (n_samples, n_points) matrices, x-axes shared by all the rows are stored once as
+    1D arrays (interned between blocks) and returned as read-only broadcast views, so the block works with every
+    pack/unpack instruction the same way as pd.DataFrame or dict folds do.
+
+    Example:
+        dataset = SpectraBlock.from_dataset(dataset, axis_labels=["axis_chem_shift"])
+    """
+    __slots__ = ("_columns", "_axes", "_length")
+
+    def __init__(self, columns: dict = None, axes: dict = None):
+        """
+        Args:
+            columns (dict): Column name and column pairs (signals, metadata).
+            axes (dict): Axis name and axis pairs, 1D axis shared by all the rows or 2D block of per-row axes.
+        """
+        self._columns = {}
+        self._axes = {}
+        self._length = None
+        for label, column in (columns or {}).items():
+            self[label] = column
+        for label, axis in (axes or {}).items():
+            self.set_axis(label, axis)
+
+    @classmethod
+    def from_frame(cls, frame, axis_labels: list = ()) -> "SpectraBlock":
+        """ Creates block from pd.DataFrame (or dict) fold.
+
+        Args:
+            frame: Fold in Preprocessor format.
+            axis_labels (list): Columns to be stored as axes, eg. DataFoldsConstants.spectro.nmr.constants
+                .DATA_FORMAT_AVAILABLE_X.
+
+        Returns:
+            (SpectraBlock)
+        """
+        block = cls()
+        for label in frame.keys():
+            if label in axis_labels:
+                block.set_axis(label, _as_array(frame[label]))
+            else:
+                block[label] = frame[label]
+        return block
+
+    @classmethod
+    def from_dataset(cls, dataset: dict, axis_labels: list = ()) -> dict:
+        """ Converts all folds of the dataset, equal axes of different folds are stored once.
+        """
+        return {fold_name: cls.from_frame(fold_data, axis_labels) for fold_name, fold_data in dataset.items()}
+
+    def to_frame(self):
+        """ Returns fold as pd.DataFrame with a row per sample (object columns of arrays for signals and axes).
+        """
+        import pandas as pd
+        return pd.DataFrame({
+            # Columns of rows of different lengths are stored as lists (np.ndim can not be used on them)
+            label: list(column) if isinstance(column, list) or np.ndim(column) > 1 else column
+            for label, column in self.items()
+        })
+
+    def set_axis(self, label: str, axis) -> None:
+        """ Stores x-axis. Axes equal for all the rows are stored once.
+
+        Args:
+            label: Axis name.
+            axis: 1D axis shared by all the rows, or 2D block (list) of per-row axes.
+        """
+        axis = _as_array(axis)
+        if isinstance(axis, np.ndarray) and axis.ndim == 2 and len(axis):
+            # Broadcast views and blocks of equal rows are stored as a single axis
+            if axis.strides[0] == 0 or (axis == axis[0]).all():
+                axis = axis[0]
+        if _is_shared(axis):
+            axis = _intern(axis)
+        else:
+            self._set_length(len(axis))
+        self._axes[label] = axis
+
+    def get_axis(self, label: str, default=None):
+        """ Returns x-axis as stored: 1D array if shared by all the rows, 2D block otherwise.
+        """
+        return self._axes.get(label, self._columns.get(label, default))
+
+    def is_axis_shared(self, label: str) -> bool:
+        return label in self._axes and _is_shared(self._axes.get(label))
+
+    def get(self, label: str, default=None):
+        if label in self._axes:
+            axis = self._axes.get(label)
+            if _is_shared(axis):
+                return np.broadcast_to(axis, (len(self),) + axis.shape)
+            return axis
+        return self._columns.get(label, default)
+
+    def keys(self) -> list:
+        return [*self._columns, *self._axes]
+
+    def items(self) -> list:
+        return [(label, self.get(label)) for label in self.keys()]
+
+    def copy(self, read_only: bool = False) -> "SpectraBlock":
+        """ Shallow copy, columns are shared by reference until replaced.
+
+        Args:
+            read_only (bool): Share numeric columns as read-only views, in place writes to the copy fail.
+        """
+        block = SpectraBlock()
+        block._columns = dict(self._columns)
+        if read_only:
+            block._columns = {label: as_read_only(column) for label, column in block._columns.items()}
+        block._axes = dict(self._axes)
+        block._length = self._length
+        return block
+
+    @property
+    def nbytes(self) -> int:
+        return sum(_get_nbytes(column) for column in [*self._columns.values(), *self._axes.values()])
+
+    def _set_length(self, length: int) -> None:
+        if self._length is None:
+            self._length = length
+        elif self._length != length:
+            raise ValueError(f"Column length {length} does not match block length {self._length}.")
+
+    def __getitem__(self, label: str):
+        if label not in self:
+            raise KeyError(label)
+        return self.get(label)
+
+    def __setitem__(self, label: str, column) -> None:
+        if label in self._axes:
+            self.set_axis(label, column)
+            return
+        column = _as_array(column)
+        self._set_length(len(column))
+        self._columns[label] = column
+
+    def __contains__(self, label: str) -> bool:
+        return label in self._columns or label in self._axes
+
+    def __len__(self) -> int:
+        return self._length or 0
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __repr__(self) -> str:
+        return f"SpectraBlock(rows={len(self)}, columns={list(self._columns)}, axes={list(self._axes)})"
+
+    def __deepcopy__(self, memo: dict) -> "SpectraBlock":
+        # Shared axes are read-only, they are not copied
+        block = self.copy()
+        block._columns = copy.deepcopy(self._columns, memo)
+        block._axes = {
+            label: axis if _is_shared(axis) else copy.deepcopy(axis, memo) for label, axis in self._axes.items()
+        }
+        return block
+
+    def __getstate__(self) -> tuple:
+        return self._columns, self._axes, self._length
+
+    def __setstate__(self, state: tuple) -> None:
+        self._columns, axes, self._length = state
+        self._axes = {label: _intern(axis) if _is_shared(axis) else axis for label, axis in axes.items()}
+
+
+def _as_array(column) -> np.ndarray or list:
+    """ Converts column into a numeric block, columns of rows of different lengths are kept as lists.
+    """
+    if isinstance(column, np.ndarray) and column.dtype != object:
+        return column
+    column = list(column)
+    try:
+        block = np.array(column)
+    except ValueError:
+        block = None
+    if block is None or (block.dtype == object and column and isinstance(column[0], (list, np.ndarray))):
+        return [np.asarray(row) for row in column]
+    return block
+
+
+def as_read_only(column):
+    """ Returns read-only view of the numeric array, rows of list columns are mapped to read-only views as well.
+    Other columns are returned as they are.
+    """
+    if isinstance(column, np.ndarray) and column.dtype != object:
+        column = column.view()
+        column.flags.writeable = False
+    elif isinstance(column, list):
+        column = [as_read_only(row) for row in column]
+    return column
+
+
+def _get_nbytes(column) -> int:
+    """ Returns size of the column data, rows of list columns are summed.
+    """
+    if isinstance(column, np.ndarray):
+        return column.nbytes
+    if isinstance(column, list):
+        return sum(row.nbytes for row in column if isinstance(row, np.ndarray))
+    return 0
+
+
+def _is_shared(axis) -> bool:
+    return isinstance(axis, np.ndarray) and axis.ndim == 1
+
+
+def _intern(axis: np.ndarray) -> np.ndarray:
+    axis = np.ascontiguousarray(axis)
+    key = (axis.dtype.str, axis.shape, hashlib.blake2b(axis.data, digest_size=16).hexdigest())
+    interned = _AXES_INTERNED.get(key)
+    if interned is None:
+        interned = axis.copy()
+        interned.flags.writeable = False
+        _AXES_INTERNED[key] = interned
+    return interned
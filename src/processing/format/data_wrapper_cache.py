@@ -0,0 +1,218 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from src.processing.format.data_wrapper_operations import WrapperOperations
+from src.readers.paths import Paths
+
+
+class ResultsCache:
+    """ Memoization cache of fold results, used when <cache> key is set on method call (or enabled globally).
+
+    Entries are keyed by the method (module, qualname, code with its constants, module source and defaults), resolved
+    method settings, pack/unpack instruction and a hash of the unpacked fold columns. Changing method defaults, body
+    or any code of its module invalidates its entries.
+
+    Tiers:
+        memory - LRU bounded by the size of stored results in bytes,
+        disk - optional, pickled results stored in DIR_CACHE.
+    """
+    DIR_CACHE = os.path.join(Paths.DIR_DATA, "cache")
+
+    enabled: bool = False
+    max_bytes: int = 512 * 1024 ** 2
+    disk: bool = False
+
+    _entries: OrderedDict = OrderedDict()
+    _bytes: int = 0
+    stats: dict = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def set(cls, enabled: bool = True, max_bytes: int = 512 * 1024 ** 2, disk: bool = False) -> None:
+        """ Sets global cache settings.
+
+        Args:
+            enabled: Use cache on every data_interface method call.
+            max_bytes: Memory tier limit.
+            disk: Store results on disk as well.
+        """
+        cls.enabled = enabled
+        cls.max_bytes = max_bytes
+        cls.disk = disk
+        cls._evict()
+
+    @classmethod
+    def clear(cls, disk: bool = False) -> None:
+        """ Removes all entries from memory tier (and disk tier if chosen) and resets statistics.
+        """
+        cls._entries.clear()
+        cls._bytes = 0
+        cls.stats.update({key: 0 for key in cls.stats})
+        if disk and os.path.isdir(cls.DIR_CACHE):
+            for file_name in os.listdir(cls.DIR_CACHE):
+                if file_name.endswith(".pkl"):
+                    os.remove(os.path.join(cls.DIR_CACHE, file_name))
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {**cls.stats, "entries": len(cls._entries), "bytes": cls._bytes}
+
+    @classmethod
+    def key(cls, function, instruction, fold_data, updated_kwargs: dict) -> str:
+        """ Returns cache key of processing method call on a single fold.
+
+        Args:
+            function: Processing method.
+            instruction: Pack/unpack instruction.
+            fold_data: Fold to be processed.
+            updated_kwargs: Resolved processing method settings.
+
+        Returns:
+            (str)
+        """
+        function = getattr(function, "__wrapped__", function)
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{function.__module__}.{function.__qualname__}".encode())
+        _hash_code(digest, function.__code__)
+        # Source of the whole module, changes of helper methods called by the method invalidate its entries as well
+        digest.update(_get_module_source_digest(function.__module__))
+        _hash_value(digest, WrapperOperations.get_function_default_arguments(function))
+        _hash_value(digest, updated_kwargs)
+        _hash_value(digest, instruction.get_instructions_type())
+        instruction_unpack, _ = instruction.get_instructions()
+        _hash_value(digest, instruction_unpack)
+        for label in _instruction_labels(instruction_unpack):
+            _hash_value(digest, WrapperOperations.as_rows(fold_data.get(label)))
+        return digest.hexdigest()
+
+    @classmethod
+    def get(cls, key: str):
+        """ Returns copy of the cached result, or None if the key is missing.
+        """
+        if key in cls._entries:
+            cls._entries.move_to_end(key)
+            cls.stats["hits"] += 1
+            return _copy_result(cls._entries.get(key))
+
+        file_path = os.path.join(cls.DIR_CACHE, f"{key}.pkl")
+        if cls.disk and os.path.exists(file_path):
+            with open(file_path, "rb") as file:
+                result = pickle.load(file)
+            cls.stats["disk_hits"] += 1
+            cls._store_memory(key, result)
+            return _copy_result(result)
+
+        cls.stats["misses"] += 1
+        return None
+
+    @classmethod
+    def put(cls, key: str, result) -> None:
+        """ Stores copy of the result, so the processed dataset can be modified by the user.
+        """
+        result = _copy_result(result)
+        cls._store_memory(key, result)
+        if cls.disk:
+            os.makedirs(cls.DIR_CACHE, exist_ok=True)
+            with open(os.path.join(cls.DIR_CACHE, f"{key}.pkl"), "wb") as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def _store_memory(cls, key: str, result) -> None:
+        size = _result_bytes(result)
+        if size > cls.max_bytes:
+            return
+        if key in cls._entries:
+            cls._bytes -= _result_bytes(cls._entries.pop(key))
+        cls._entries[key] = result
+        cls._bytes += size
+        cls._evict()
+
+    @classmethod
+    def _evict(cls) -> None:
+        while cls._entries and cls._bytes > cls.max_bytes:
+            _, result = cls._entries.popitem(last=False)
+            cls._bytes -= _result_bytes(result)
+            cls.stats["evictions"] += 1
+
+
+def get_value_digest(value) -> str:
+    """ Returns digest of the value (eg. method settings), arrays are hashed by their buffer, not by their repr which
+    is shortened for large arrays.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    _hash_value(digest, value)
+    return digest.hexdigest()
+
+
+def _instruction_labels(instruction_unpack: dict) -> list:
+    labels = []
+    for label in instruction_unpack.values():
+        labels.extend(label if isinstance(label, list) else [label])
+    return labels
+
+
+def _hash_value(digest, value) -> None:
+    """ Updates digest with passed value, arrays are hashed by their buffer.
+    """
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(value.data if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_value(digest, item)
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(str(key).encode())
+            _hash_value(digest, value.get(key))
+    else:
+        digest.update(repr(value).encode())
+
+
+def _hash_code(digest, code) -> None:
+    """ Hashes bytecode and constants, nested code objects (eg. comprehensions) are hashed the same way.
+    """
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _hash_code(digest, const)
+        else:
+            # Code objects repr contains their address, other constants repr is stable between runs
+            digest.update(repr(const).encode())
+
+
+@lru_cache(maxsize=None)
+def _get_module_source_digest(module_name: str) -> bytes:
+    """ Returns cached digest of the module source, empty if the source is not available (eg. interactive session).
+    """
+    try:
+        source = inspect.getsource(sys.modules[module_name])
+    except (KeyError, OSError, TypeError):
+        return b""
+    return hashlib.blake2b(source.encode(), digest_size=20).digest()
+
+
+def _copy_result(result):
+    if isinstance(result, np.ndarray):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy_result(item) for item in result)
+    if isinstance(result, list):
+        return [_copy_result(item) for item in result]
+    return result
+
+
+def _result_bytes(result) -> int:
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (list, tuple)):
+        return sum(_result_bytes(item) for item in result)
+    return 0
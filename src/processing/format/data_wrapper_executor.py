@@ -0,0 +1,179 @@
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, repeat
+from math import ceil
+
+import numpy as np
+
+from src.processing.format.data_wrapper_operations import WrapperOperations
+
+# Number of chunks created per worker, more chunks balance the load, less chunks reduce pickling cost
+CHUNKS_PER_WORKER = 4
+
+
+class ExecutorSettings:
+    """ Global execution settings, used when <workers>/<executor> keys are not passed on method call.
+
+    Executors:
+        "process" - process pool, for methods which hold the GIL (pure Python loops, per-row SciPy calls on short
+            signals), processing method and data are pickled.
+        "thread" - thread pool, for methods which spend most of the time in GIL-releasing kernels (NumPy FFT,
+            SciPy ndimage/LAPACK), nothing is pickled.
+    """
+    EXECUTOR_PROCESS = "process"
+    EXECUTOR_THREAD = "thread"
+    EXECUTORS_AVAILABLE = {
+        EXECUTOR_PROCESS: ProcessPoolExecutor,
+        EXECUTOR_THREAD: ThreadPoolExecutor,
+    }
+
+    workers: int = None
+    executor: str = EXECUTOR_PROCESS
+
+    @classmethod
+    def set(cls, workers: int = None, executor: str = EXECUTOR_PROCESS) -> None:
+        """ Sets global execution settings.
+
+        Args:
+            workers: Number of workers, None or 1 runs serial loop.
+            executor: Executor type, one of EXECUTORS_AVAILABLE keys.
+        """
+        cls.check(executor)
+        cls.workers = workers
+        cls.executor = executor
+
+    @classmethod
+    def check(cls, executor: str) -> None:
+        if executor not in cls.EXECUTORS_AVAILABLE:
+            raise ValueError(f"Executor <{executor}> not supported. Available: {list(cls.EXECUTORS_AVAILABLE)}")
+
+
+def process_in_executor(
+        function,
+        folds_unpacked: dict,
+        workers: int,
+        executor: str = ExecutorSettings.EXECUTOR_PROCESS
+) -> dict:
+    """ Parallel processing of unpacked folds.
+
+    Rows of all folds are split into chunks of equal size and spread over a process or thread pool. Results are
+    returned in the same order as produced by the serial loop. Settings fitted on the rows (see data_interface <fit>)
+    are calculated on the whole block before it is split, blocks of methods which rows depend on each other are
+    processed in one piece.
+
+    Args:
+        function: Chosen processing method, must be picklable for the process pool.
+        folds_unpacked: Unpacked folds {fold_name: (data_unpacked, is_batch)}.
+        workers: Number of workers.
+        executor: Executor type, "process" or "thread".
+
+    Returns:
+        (dict): Results in the serial loop format {fold_name: result}.
+
+    """
+    ExecutorSettings.check(executor)
+    total_rows = sum(_count_rows(data_unpacked, is_batch) for data_unpacked, is_batch in folds_unpacked.values())
+    chunk_rows = max(1, ceil(total_rows / (workers * CHUNKS_PER_WORKER)))
+
+    jobs = []
+    layout = {}
+    for fold_name, (data_unpacked, is_batch) in folds_unpacked.items():
+        if is_batch:
+            groups = [[[part] for part in _split_batch_item(function, data_dict, chunk_rows)]
+                      for data_dict in data_unpacked]
+        else:
+            groups = [[data_unpacked[idx:idx + chunk_rows] for idx in range(0, len(data_unpacked), chunk_rows)]]
+        layout.update({fold_name: (is_batch, [len(group) for group in groups], len(data_unpacked))})
+        for group in groups:
+            jobs.extend(group)
+
+    with ExecutorSettings.EXECUTORS_AVAILABLE.get(executor)(max_workers=workers) as pool:
+        results = iter(list(pool.map(_execute_job, repeat(function), jobs)))
+
+    folds_result = {}
+    for fold_name, (is_batch, group_sizes, length) in layout.items():
+        if is_batch:
+            blocks = [
+                WrapperOperations.concatenate_blocks([next(results)[0] for _ in range(group_size)])
+                for group_size in group_sizes
+            ]
+            folds_result.update({fold_name: WrapperOperations.merge_blocks(blocks)})
+        else:
+            rows = chain.from_iterable(next(results) for _ in range(group_sizes[0]))
+            folds_result.update({fold_name: WrapperOperations.collect_rows(rows, length)})
+    return folds_result
+
+
+def benchmark(
+        function,
+        data: dict,
+        workers: tuple = (1, 2, 4),
+        executors: tuple = (ExecutorSettings.EXECUTOR_PROCESS, ExecutorSettings.EXECUTOR_THREAD),
+        repeats: int = 3,
+        **kwargs
+) -> dict:
+    """ Measures processing time of a data_interface method for every executor and number of workers.
+
+    Use it on the target machine to check which methods scale with threads.
+
+    Args:
+        function: Method declared with data_interface wrapper.
+        data: Dataset package in Preprocessor format.
+        workers: Numbers of workers to be checked.
+        executors: Executor types to be checked.
+        repeats: Number of repetitions, the best time is returned.
+        **kwargs: Processing method settings.
+
+    Returns:
+        (dict): Best times in seconds {(executor, workers): time}.
+    """
+    timings = {}
+    for executor in executors:
+        for workers_no in workers:
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                function(data=data, workers=workers_no, executor=executor, copy_on_write=True, **kwargs)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.update({(executor, workers_no): best})
+    return timings
+
+
+def _execute_job(function, job: list) -> list:
+    """ Worker task, calls processing method on every unpacked item of the job.
+    """
+    # Call the method itself, not its wrapper
+    function = getattr(function, "__wrapped__", function)
+    return [function(**data_dict) for data_dict in job]
+
+
+def _count_rows(data_unpacked: list, is_batch: bool) -> int:
+    if is_batch:
+        return sum(len(data_dict.get("y")) for data_dict in data_unpacked)
+    return len(data_unpacked)
+
+
+def _split_batch_item(function, data_dict: dict, chunk_rows: int) -> list:
+    """ Splits batch unpacked item into row chunks, with the settings fitted on the whole block.
+    """
+    data_dict = {**data_dict, **WrapperOperations.fit_block(function, data_dict)}
+    if WrapperOperations.is_rows_dependent(function, data_dict):
+        return [data_dict]
+    return _split_block_kwargs(data_dict, chunk_rows)
+
+
+def _split_block_kwargs(data_dict: dict, chunk_rows: int) -> list:
+    """ Splits batch unpacked item into row chunks. Per-row x-axes are split together with the signal.
+    """
+    Y = data_dict.get("y")
+    X = data_dict.get("x")
+    parts = []
+    for idx in range(0, len(Y), chunk_rows):
+        part = dict(data_dict)
+        part.update({"y": Y[idx:idx + chunk_rows]})
+        if X is not None and np.ndim(X) == 2:
+            part.update({"x": X[idx:idx + chunk_rows]})
+        parts.append(part)
+    return parts
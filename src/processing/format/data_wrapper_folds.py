@@ -1,6 +1,15 @@
+import copy
 
+from collections import deque
+
+import numpy as np
+
+from src.processing.format.data_wrapper_block import SpectraBlock, as_read_only
+from src.processing.format.data_wrapper_cache import ResultsCache
+from src.processing.format.data_wrapper_executor import ExecutorSettings, process_in_executor
 from src.processing.format.data_wrapper_format_pack import data_pack
-from src.processing.format.data_wrapper_format_unpack import data_unpack
+from src.processing.format.data_wrapper_format_unpack import data_unpack, data_unpack_batch
+from src.processing.format.data_wrapper_operations import WrapperOperations
 from src.processing.format.constants.constants_template import PreprocessorConfiguration
 
 
@@ -8,11 +17,17 @@ def process_fold_by_fold(
         function,
         instruction: PreprocessorConfiguration,
         data: dict,
-        updated_kwargs
+        updated_kwargs,
+        batch: bool = False,
+        workers: int = None,
+        executor: str = ExecutorSettings.EXECUTOR_PROCESS,
+        cache: bool = False
 ) -> dict:
     """ Fold processing method.
 
     This method pass data on chosen processing method, every line of chosen variables will be calculated independently.
+    Methods declared as batch-capable receive the whole fold as a 2D block instead, the per-row loop is kept only as a
+    fallback for folds which rows can not be stacked.
 
     Args:
         function: Chosen processing method.
@@ -20,6 +35,10 @@ def process_fold_by_fold(
             method.
         data: Dataset package in Preprocessor format.
         updated_kwargs: Updated settings passed on processing method.
+        batch: Pass the fold on processing method as a (n_samples, n_points) block.
+        workers: Number of workers. Folds and row chunks are spread over a pool if set above 1.
+        executor: Pool type: "process" (method has to be picklable, declared at module level) or "thread".
+        cache: Reuse fold results stored in ResultsCache, computed folds are stored.
 
     Returns: Processed dataset.
 
@@ -28,11 +47,198 @@ def process_fold_by_fold(
     instruction_unpack_type, instruction_pack_type = instruction.get_instructions_type()
     instruction_unpack, instruction_pack = instruction.get_instructions()
 
+    folds_result = {}
+    cache_keys = {}
+    if cache:
+        for fold_name, fold_data in data.items():
+            cache_keys.update({fold_name: ResultsCache.key(function, instruction, fold_data, updated_kwargs)})
+            result = ResultsCache.get(cache_keys.get(fold_name))
+            if result is not None:
+                folds_result.update({fold_name: result})
+    folds_pending = [fold_name for fold_name in data.keys() if fold_name not in folds_result]
+
+    if workers is not None and workers > 1 and folds_pending:
+        folds_unpacked = {
+            fold_name: _unpack_fold(
+                instruction_unpack_type, data.get(fold_name), instruction_unpack, updated_kwargs, batch)
+            for fold_name in folds_pending
+        }
+        folds_computed = process_in_executor(
+            function=function, folds_unpacked=folds_unpacked, workers=workers, executor=executor)
+    else:
+        folds_computed = {}
+        for fold_name in folds_pending:
+            data_unpacked, is_batch = _unpack_fold(
+                instruction_unpack_type, data.get(fold_name), instruction_unpack, updated_kwargs, batch)
+            folds_computed.update({fold_name: _process_unpacked(function, data_unpacked, is_batch)})
+
+    if cache:
+        for fold_name, result in folds_computed.items():
+            ResultsCache.put(cache_keys.get(fold_name), result)
+    folds_result.update(folds_computed)
+
     data_processed = {}
     for fold_name, fold_data in data.items():
-        data_unpacked = data_unpack(instruction_unpack_type, fold_data, instruction_unpack, **updated_kwargs)
-        result = [function(**data_dict) for data_dict in data_unpacked]
-        updated_fold = data_pack(instruction_pack_type, fold_data, instruction_pack, result)
+        updated_fold = data_pack(instruction_pack_type, fold_data, instruction_pack, folds_result.get(fold_name))
         data_processed.update({fold_name: updated_fold})
     return data_processed
 
+
+def process_stream(
+        function,
+        instruction: PreprocessorConfiguration,
+        chunks,
+        updated_kwargs,
+        batch: bool = False,
+        workers: int = None,
+        executor: str = ExecutorSettings.EXECUTOR_PROCESS
+):
+    """ Streaming fold processing method.
+
+    Chunks (folds or row slices of folds, eg. memory-mapped arrays) are consumed from an iterator and yielded as soon
+    as processed, only a bounded number of chunks is held in memory at once (one, or two per worker).
+
+    Args:
+        function: Chosen processing method.
+        instruction: Dictionary with pack/unpack instructions that determines way the data is passed on processing
+            method.
+        chunks: Iterable of folds in Preprocessor format (dict or pd.DataFrame).
+        updated_kwargs: Updated settings passed on processing method.
+        batch: Pass the chunk on processing method as a (n_samples, n_points) block.
+        workers: Number of workers, chunks are processed in parallel if set above 1.
+        executor: Pool type: "process" (method has to be picklable, declared at module level) or "thread".
+
+    Returns:
+        (generator): Processed chunks, in the order of the passed ones. Passed chunks are not modified.
+
+    """
+    if batch and WrapperOperations.is_rows_dependent(function, updated_kwargs):
+        # Settings fitted on a chunk (eg. MSC reference) would differ from the ones fitted on the whole fold
+        fit_keys = [key for key in getattr(function, "fit", {}) if updated_kwargs.get(key) is None]
+        dependent_keys = [
+            key for key in getattr(function, "dependent_kwargs", ()) if updated_kwargs.get(key) is not None]
+        hints = ([f"pass settings fitted on the whole dataset {fit_keys}"] if fit_keys else []) + (
+            [f"unset {dependent_keys}"] if dependent_keys else [])
+        raise ValueError(
+            f"Method <{getattr(function, '__name__', function)}> result depends on other rows of the fold, it can not "
+            f"be processed in chunks: {', '.join(hints)}.")
+    return _process_chunks(function, instruction, chunks, updated_kwargs, batch, workers, executor)
+
+
+def _process_chunks(
+        function,
+        instruction: PreprocessorConfiguration,
+        chunks,
+        updated_kwargs,
+        batch: bool,
+        workers: int,
+        executor: str
+):
+    """ Generator of processed chunks, see process_stream.
+    """
+    instruction_unpack_type, instruction_pack_type = instruction.get_instructions_type()
+    instruction_unpack, instruction_pack = instruction.get_instructions()
+
+    if workers is None or workers <= 1:
+        for chunk in chunks:
+            chunk = _copy_fold_shallow(chunk)
+            data_unpacked, is_batch = _unpack_fold(
+                instruction_unpack_type, chunk, instruction_unpack, updated_kwargs, batch)
+            result = _process_unpacked(function, data_unpacked, is_batch)
+            yield data_pack(instruction_pack_type, chunk, instruction_pack, result)
+        return
+
+    ExecutorSettings.check(executor)
+    with ExecutorSettings.EXECUTORS_AVAILABLE.get(executor)(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            chunk = _copy_fold_shallow(chunk)
+            data_unpacked, is_batch = _unpack_fold(
+                instruction_unpack_type, chunk, instruction_unpack, updated_kwargs, batch)
+            pending.append((chunk, pool.submit(_process_unpacked, function, data_unpacked, is_batch)))
+            # Keep the workers busy, but do not read ahead more than two chunks per worker
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield data_pack(instruction_pack_type, chunk, instruction_pack, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield data_pack(instruction_pack_type, chunk, instruction_pack, future.result())
+
+
+def copy_folds(
+        data: dict,
+        copy_on_write: bool = False
+) -> dict:
+    """ Copies dataset before processing.
+
+    Args:
+        data: Dataset package in Preprocessor format.
+        copy_on_write: Copy mode.
+            False - deep copy of the whole dataset,
+            True - shallow copy of every fold, columns are shared by reference until the pack operation replaces them.
+                Shared arrays are passed as read-only views, so in place writes fail instead of modifying
+                the passed dataset.
+
+    Returns: Copied dataset.
+
+    """
+    if not copy_on_write:
+        return copy.deepcopy(data)
+    return {fold_name: _copy_fold_shallow(fold_data) for fold_name, fold_data in data.items()}
+
+
+def _copy_fold_shallow(fold_data):
+    """ Returns new fold container that shares columns with the passed one, as read-only views.
+    """
+    if isinstance(fold_data, dict):
+        return {label: as_read_only(column) for label, column in fold_data.items()}
+    if isinstance(fold_data, SpectraBlock):
+        return fold_data.copy(read_only=True)
+    # Data frame deep copy does not copy objects stored in columns (rows are shared by reference), shallow copy would
+    # share blocks with the passed frame and keep replaced columns alive
+    fold_data = fold_data.copy(deep=True)
+    for label in fold_data.columns:
+        column = fold_data[label]
+        if column.dtype == object and len(column) and isinstance(column.iat[0], np.ndarray):
+            fold_data[label] = as_read_only(list(column))
+    return fold_data
+
+
+def _process_unpacked(function, data_unpacked: list, is_batch: bool):
+    """ Calls processing method on every unpacked item of the fold and returns the fold result.
+    """
+    # Call the method itself, not its wrapper
+    function = getattr(function, "__wrapped__", function)
+    if is_batch:
+        return WrapperOperations.merge_blocks([function(**data_dict) for data_dict in data_unpacked])
+    return WrapperOperations.collect_rows(
+        (function(**data_dict) for data_dict in data_unpacked), len(data_unpacked))
+
+
+def _unpack_fold(
+        instruction_unpack_type: int,
+        fold_data: dict,
+        instruction_unpack: dict,
+        updated_kwargs: dict,
+        batch: bool
+) -> tuple:
+    """ Unpacks a single fold, as 2D blocks if possible.
+
+    Args:
+        instruction_unpack_type: Unpacking instruction type.
+        fold_data: Fold to be processed.
+        instruction_unpack: Unpacking instruction.
+        updated_kwargs: Updated settings passed on processing method.
+        batch: Try to unpack the fold as 2D blocks.
+
+    Returns:
+        (list, bool): Unpacked data and information whether it was unpacked as blocks.
+
+    """
+    if batch:
+        try:
+            return data_unpack_batch(instruction_unpack_type, fold_data, instruction_unpack, **updated_kwargs), True
+        except ValueError:
+            # Rows of different length, fall back to per-row processing
+            pass
+    return data_unpack(instruction_unpack_type, fold_data, instruction_unpack, **updated_kwargs), False
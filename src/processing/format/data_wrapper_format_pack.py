@@ -1,7 +1,6 @@
 
-import numpy as np
-
 from src.processing.format.constants.constants_template import PreprocessorConstants
+from src.processing.format.data_wrapper_operations import WrapperOperations
 from src.processing.format.data_wrapper_format import DataFormat
 
 
@@ -24,7 +23,7 @@ def data_pack(
 
     """
     data = fold_data
-    data["data"] = np.array(result)
+    data["data"] = WrapperOperations.pack_rows(result)
     return data
 
 
@@ -47,7 +46,7 @@ def _pack_wrapper_result_as_y(
         (dict)
 
     """
-    data.update({instruction.get("y"): result})
+    WrapperOperations.set_column(data, instruction.get("y"), WrapperOperations.pack_rows(result))
     return data
 
 
@@ -69,7 +68,43 @@ def _pack_wrapper_result_as_multiple_yx(
     Returns: Updated data fold.
 
     """
-    for label in instruction.get("y"):
-        partial_result = [result.pop(0) for _ in range(len(data.get(label).tolist()))]
-        data.update({label: partial_result})
+    # Result rows of all labels are stored one after another, slice them by label offsets
+    labels = instruction.get("y")
+    # A single 1D signal is a single row (as unpacked), not a row per point
+    is_signal = [WrapperOperations.is_matrix_1d(WrapperOperations.as_rows(data.get(label))) for label in labels]
+    offsets = WrapperOperations.get_offsets(
+        [1 if signal else len(data.get(label)) for label, signal in zip(labels, is_signal)])
+    for label, signal, start, stop in zip(labels, is_signal, offsets[:-1], offsets[1:]):
+        rows = result[start:stop]
+        WrapperOperations.set_column(data, label, rows[0] if signal else WrapperOperations.pack_rows(rows))
+    return data
+
+
+@data_pack.format(PreprocessorConstants().PROCESS_DATA_AS_Y_OF_X)
+def _pack_wrapper_result_as_y_of_x(
+        data_format: str,
+        data: dict,
+        instruction: dict,
+        result: list
+) -> dict:
+    """ "Y(X)" type packing wrapper, used by methods that change the x-axis (eg. resampling).
+
+    Processing method returns (y, x) pair, both signal and x-axis columns are updated.
+
+    Args:
+        data_format (int): Tag used for switch-case wrapper cast. Not used inside method.
+        data (dict): Dataset that will be unpacked with method kwargs.
+        instruction (dict): Defines what kind of data will be updated.
+        result (list): Processed data, (y, x) rows or a (y, x) tuple of blocks.
+
+    Returns: Updated data fold.
+
+    """
+    if isinstance(result, tuple):
+        Y, X = result
+    else:
+        Y, X = (WrapperOperations.pack_rows(list(rows)) for rows in zip(*result))
+    WrapperOperations.set_column(data, instruction.get("y"), WrapperOperations.pack_rows(Y))
+    # SpectraBlock stores axes equal for all the rows once
+    WrapperOperations.set_column(data, instruction.get("x"), WrapperOperations.pack_rows(X))
     return data
@@ -1,3 +1,4 @@
+import numpy as np
 
 from src.processing.format.constants.constants_template import PreprocessorConstants
 from src.processing.format.data_wrapper_operations import WrapperOperations
@@ -24,7 +25,7 @@ def data_unpack(
 
     """
 
-    Y = data.get("data").tolist()
+    Y = WrapperOperations.as_rows(data.get("data"))
     return [{**kwargs, **{"y": y}} for y in Y]
 
 
@@ -53,7 +54,7 @@ def _unpack_wrapper_data_as_y(
         (list)
     """
 
-    Y = data.get(instruction.get("y")).tolist()
+    Y = WrapperOperations.as_rows(data.get(instruction.get("y")))
     if WrapperOperations.is_matrix_1d(Y):
         return [{**kwargs, **{"y": Y}}]
     else:
@@ -88,8 +89,8 @@ def _unpack_wrapper_data_as_y_of_x(
 
     """
 
-    X = data.get(instruction.get("x")).tolist()
-    Y = data.get(instruction.get("y")).tolist()
+    X = WrapperOperations.as_rows(WrapperOperations.get_axis(data, instruction.get("x")))
+    Y = WrapperOperations.as_rows(data.get(instruction.get("y")))
 
     if WrapperOperations.is_matrix_1d(X):
         return [{**kwargs, **{"y": y}, **{"x": X}} for y in Y]
@@ -123,9 +124,145 @@ def _unpack_wrapper_data_as_multiple_yx(
 
     """
 
+    # Rows of all labels are stored one after another, in the order of labels (see pack offsets)
+    return [
+        {**kwargs, **{"y": y}}
+        for label in instruction.get("y")
+        for y in _as_label_rows(data.get(label))
+    ]
+
+
+def _as_label_rows(column) -> list:
+    Y = WrapperOperations.as_rows(column)
+    if WrapperOperations.is_matrix_1d(Y):
+        return [Y]
+    return Y
+
+
+@DataFormat
+def data_unpack_batch(
+        data_format: None,
+        data: dict,
+        **kwargs
+) -> list:
+    """ Default batch unpacking wrapper. Produces output:
+
+    [{"y": data[0:n], method_kwargs}]
+
+    Args:
+        data_format: Information tag for switch-case wrapper cast.
+        data: Dataset that will be unpacked.
+        **kwargs: Processing method settings.
+
+    Returns:
+        (list)
+
+    """
+
+    Y = np.atleast_2d(WrapperOperations.as_block(data.get("data")))
+    return [{**kwargs, **{"y": Y}}]
+
+
+@data_unpack_batch.format(PreprocessorConstants().PROCESS_DATA_AS_Y)
+def _unpack_wrapper_batch_as_y(
+        data_format: int,
+        data: dict,
+        instruction: dict,
+        **kwargs
+) -> list:
+    """ "Y(None)" type batch unpacking wrapper. On passed instruction:
+
+    instruction["y"] == "signal"
+
+    Produces output:
+
+    [{"y": signal[0:n], method_kwargs}]
+
+    Args:
+        data_format (int): Tag used for switch-case wrapper cast. Not used inside method.
+        data (dict): Dataset that will be unpacked with method kwargs.
+        instruction (dict): Defines what kind of data will be unpacked.
+        **kwargs: Processing method settings.
+
+    Raises:
+        ValueError: If rows can not be stacked into a 2D block.
+
+    Returns:
+        (list)
+    """
+
+    Y = np.atleast_2d(WrapperOperations.as_block(data.get(instruction.get("y"))))
+    return [{**kwargs, **{"y": Y}}]
+
+
+@data_unpack_batch.format(PreprocessorConstants().PROCESS_DATA_AS_Y_OF_X)
+def _unpack_wrapper_batch_as_y_of_x(
+        data_format: int,
+        data: dict,
+        instruction: dict,
+        **kwargs
+) -> list:
+    """ "Y(X)" type batch unpacking wrapper. On passed instruction:
+
+    instruction["y"] = "signal"
+    instruction["x"] = "x_axis"
+
+    Produces output:
+
+    [{"y": signal[0:n], "x": x_axis[0:n], **processing_method_settings}]
+
+    If the x-axis is stored once for the whole fold, it is passed on as a 1D array.
+
+    Args:
+        data_format (int): Tag used for switch-case wrapper cast. Not used inside method.
+        data (dict): Dataset that will be unpacked with method kwargs.
+        instruction (dict): Defines what kind of data will be unpacked.
+        **kwargs: Processing method settings.
+
+    Raises:
+        ValueError: If rows can not be stacked into a 2D block.
+
+    Returns:
+        (list)
+
+    """
+
+    X = WrapperOperations.as_block(WrapperOperations.get_axis(data, instruction.get("x")))
+    Y = np.atleast_2d(WrapperOperations.as_block(data.get(instruction.get("y"))))
+    return [{**kwargs, **{"y": Y}, **{"x": X}}]
+
+
+@data_unpack_batch.format(PreprocessorConstants().PROCESS_DATA_AS_MULTIPLE_YX)
+def _unpack_wrapper_batch_as_multiple_yx(
+        data_format: int,
+        data: dict,
+        instruction: dict,
+        **kwargs
+) -> list:
+    """ "[Y0 ... Yn, X0 ... Xn]" type batch unpacking wrapper. On passed instruction:
+
+    instruction["y"] = ["signal", "x_axis"]
+
+    Will produce output bellow, one block per label:
+
+    [{"y": signal[0:n], method_kwargs}, {"y": x_axis[0:n], method_kwargs}]
+
+    Args:
+        data_format (int): Tag used for switch-case wrapper cast. Not used inside method.
+        data (dict): Dataset that will be unpacked with method kwargs.
+        instruction (dict): Defines what kind of data will be unpacked.
+        **kwargs: Processing method settings.
+
+    Raises:
+        ValueError: If rows can not be stacked into a 2D block.
+
+    Returns: Unpacked data with key-values processing method settings.
+
+    """
+
     dataset = []
     for label in instruction.get("y"):
-        dataset.extend(_unpack_wrapper_data_as_y(
+        dataset.extend(_unpack_wrapper_batch_as_y(
             data_format=data_format,
             instruction={"y": label},
             data=data,
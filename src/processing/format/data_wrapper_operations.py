@@ -1,8 +1,15 @@
 
 import inspect
 
+from itertools import chain
+
 import numpy as np
 
+from src.processing.format.data_wrapper_block import SpectraBlock
+
+# Sentinel of an empty rows iterator, processing methods may return None
+_EMPTY = object()
+
 
 class WrapperOperations:
     """ A collection class of methods intended to support wrappers.
@@ -56,6 +63,231 @@ class WrapperOperations:
             else:
                 return False
 
+    @staticmethod
+    def as_block(column) -> np.ndarray:
+        """ Returns data column as a numeric array.
+
+        A column of a single signal is returned as a 1D array, a column of rows is stacked into
+        a 2D (n_samples, n_points) block.
+
+        Args:
+            column: Data column, eg. np.ndarray, list or pd.Series of rows.
+
+        Raises:
+            ValueError: If rows of the column have different lengths.
+
+        Returns:
+            (np.ndarray)
+        """
+        if isinstance(column, np.ndarray) and column.dtype != object:
+            return column
+        block = np.array(list(column))
+        if block.dtype == object:
+            raise ValueError("Rows of the passed column have different lengths.")
+        return block
+
+    @staticmethod
+    def as_rows(column) -> np.ndarray or list:
+        """ Returns data column as rows without per-element conversions.
+
+        Numeric arrays are returned as they are (iterating a 2D array yields row views of its buffer), other columns
+        are returned as a list of 1D arrays. Rows already stored as arrays are not copied.
+
+        Args:
+            column: Data column, eg. np.ndarray, list or pd.Series of rows.
+
+        Returns:
+            (np.ndarray) | (list)
+        """
+        if isinstance(column, np.ndarray) and column.dtype != object:
+            return column
+        column = list(column)
+        if not column or np.ndim(column[0]) == 0:
+            return np.asarray(column)
+        return [np.asarray(row) for row in column]
+
+    @staticmethod
+    def collect_rows(rows, length: int) -> np.ndarray or list:
+        """ Writes per-row results into a preallocated block as they are produced.
+
+        Args:
+            rows: Iterable of processing method results, one per row.
+            length: Number of rows.
+
+        Returns:
+            (np.ndarray): Block of results, if all rows are arrays of the same shape and type.
+            (list): Results otherwise (eg. tuples or rows of different lengths).
+        """
+        rows = iter(rows)
+        first = next(rows, _EMPTY)
+        if first is _EMPTY:
+            return []
+        if not isinstance(first, np.ndarray):
+            return [first, *rows]
+        block = np.empty((length,) + first.shape, dtype=first.dtype)
+        block[0] = first
+        for idx, row in enumerate(rows, start=1):
+            if not isinstance(row, np.ndarray) or row.shape != first.shape or row.dtype != first.dtype:
+                # Rows can not be stored in one block, keep them as a list
+                return [*block[:idx], row, *rows]
+            block[idx] = row
+        return block
+
+    @staticmethod
+    def pack_rows(rows: list or np.ndarray) -> np.ndarray or list:
+        """ Writes per-row results into a block, blocks are passed as they are.
+
+        Args:
+            rows: Results of the processing method, one per row.
+
+        Returns:
+            (np.ndarray): Block of results, if all rows are arrays of the same shape and type.
+            (list): Passed rows otherwise (eg. tuples or rows of different lengths).
+        """
+        if isinstance(rows, np.ndarray):
+            return rows
+        return WrapperOperations.collect_rows(rows, len(rows))
+
+    @staticmethod
+    def get_axis(data: dict, label: str):
+        """ Returns x-axis column of the fold, a single 1D axis if SpectraBlock stores it once for all the rows.
+        """
+        if isinstance(data, SpectraBlock):
+            return data.get_axis(label)
+        return data.get(label)
+
+    @staticmethod
+    def set_column(data: dict, label: str, column: np.ndarray or list) -> None:
+        """ Updates fold column with processed data.
+
+        Dictionary folds and SpectraBlock store 2D blocks as they are, data frames get row views of the block (no data
+        is copied).
+
+        Args:
+            data: Fold to be updated, dict or pd.DataFrame.
+            label: Column name.
+            column: Processed data.
+        """
+        if isinstance(column, np.ndarray) and column.ndim > 1 and not isinstance(data, (dict, SpectraBlock)):
+            column = list(column)
+        data[label] = column
+
+    @staticmethod
+    def split_block(result: np.ndarray or tuple) -> list:
+        """ Splits a batch method result into rows, the same format as produced by the per-row loop.
+
+        Args:
+            result: 2D (n_samples, n_points) block or a tuple of blocks (eg. baseline "both" output).
+
+        Returns:
+            (list): Row views of the result, or row tuples if tuple of blocks was passed.
+        """
+        if isinstance(result, tuple):
+            return list(zip(*result))
+        return list(result)
+
+    @staticmethod
+    def merge_blocks(results: list) -> np.ndarray or list:
+        """ Merges results of batch method calls (one per unpacked block) into fold result rows.
+
+        Args:
+            results: Blocks or tuples of blocks returned by the processing method.
+
+        Returns:
+            (np.ndarray): Single block, packed as it is without splitting it into rows, or blocks of the same row
+                format concatenated.
+            (list): Result rows otherwise.
+        """
+        if len(results) == 1 and isinstance(results[0], np.ndarray):
+            return results[0]
+        if WrapperOperations.is_same_row_format(results):
+            # Blocks of multiple labels (eg. signal and x-axis), packed by row offsets
+            return np.concatenate(results, axis=0)
+        rows = []
+        for result in results:
+            rows.extend(WrapperOperations.split_block(result))
+        return rows
+
+    @staticmethod
+    def is_same_row_format(blocks: list) -> bool:
+        """ Checks whether all passed results are 2D blocks of the same row length and type.
+        """
+        return all(
+            isinstance(block, np.ndarray) and block.ndim == 2 and block.shape[1:] == blocks[0].shape[1:]
+            and block.dtype == blocks[0].dtype
+            for block in blocks
+        )
+
+    @staticmethod
+    def get_offsets(lengths: list) -> np.ndarray:
+        """ Returns offsets of consecutive parts in a flat sequence, part i spans offsets[i]:offsets[i + 1].
+
+        Args:
+            lengths: Lengths of the parts.
+
+        Returns:
+            (np.ndarray): Offsets, one more than passed lengths.
+        """
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return offsets
+
+    @staticmethod
+    def concatenate_blocks(blocks: list) -> np.ndarray or tuple:
+        """ Concatenates row chunks of a block (or of a tuple of blocks) processed separately.
+
+        Args:
+            blocks: Processed chunks, in rows order.
+
+        Returns:
+            (np.ndarray) | (tuple) | (list): List if the chunks are lists of row results (eg. peaks of different count
+                per row), which can not be stacked.
+        """
+        if len(blocks) == 1:
+            return blocks[0]
+        if isinstance(blocks[0], list):
+            return list(chain.from_iterable(blocks))
+        if isinstance(blocks[0], tuple):
+            return tuple(np.concatenate(parts, axis=0) for parts in zip(*blocks))
+        return np.concatenate(blocks, axis=0)
+
+    @staticmethod
+    def fit_block(function, data_dict: dict) -> dict:
+        """ Calculates method settings declared with data_interface <fit> from the rows of the unpacked block.
+
+        Args:
+            function: Processing method declared with data_interface wrapper.
+            data_dict: Batch unpacked item, settings passed by the user are kept.
+
+        Returns:
+            (dict): Fitted settings {kwarg: value}, empty if all of them were passed.
+        """
+        return {
+            key: fit(data_dict.get("y")) for key, fit in getattr(function, "fit", {}).items()
+            if data_dict.get(key) is None
+        }
+
+    @staticmethod
+    def is_rows_dependent(function, kwargs: dict) -> bool:
+        """ Checks whether the method result for a row depends on other rows of the block, such block can not be split
+        into chunks processed separately.
+
+        Args:
+            function: Processing method declared with data_interface wrapper, or fused pipeline steps.
+            kwargs: Settings passed on the processing method.
+
+        Returns:
+            (bool)
+        """
+        steps = getattr(function, "steps", None)
+        if steps is not None:
+            # Fused pipeline steps, settings of a step can not be fitted before the previous steps are calculated
+            return any(WrapperOperations.is_rows_dependent(step, step_kwargs) for step, step_kwargs in steps)
+        return (
+            any(kwargs.get(key) is None for key in getattr(function, "fit", {}))
+            or any(kwargs.get(key) is not None for key in getattr(function, "dependent_kwargs", ()))
+        )
+
     @staticmethod
     def is_key_in_kwargs(default_kv: dict, **kwargs):
         # Check that the kwargs passed match the default settings
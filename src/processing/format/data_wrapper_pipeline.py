@@ -0,0 +1,158 @@
+import numpy as np
+
+from src.processing.format.data_wrapper_executor import ExecutorSettings
+from src.processing.format.data_wrapper_folds import copy_folds, process_fold_by_fold
+from src.processing.format.data_wrapper_operations import WrapperOperations
+
+
+class Pipeline:
+    """ Chain of data_interface methods executed with a single copy of the dataset.
+
+    Consecutive steps sharing the same pack/unpack instruction are fused: the fold is unpacked once, every row (or
+    block) is passed through all the steps of the group and the final result is packed once. Intermediate results
+    never hit the fold. If any step of the group is batch-capable, the fold is unpacked as a block and per-row steps
+    loop over its rows.
+
+    Example:
+        pipeline = Pipeline([
+            (Preprocessor.filter.sav_gol, {"window_size": 15}),
+            (Preprocessor.baseline.als_optimized, {"lam": 10**5}),
+            (Preprocessor.dimensions.cut_in_range, {"cut_range": (10, -10)}),
+        ])
+        processed_data = pipeline(data=nested_dataset)
+    """
+
+    def __init__(self, steps: list):
+        """
+        Args:
+            steps (list): Sequence of (method, kwargs) tuples, or methods to be called with default settings.
+                Methods have to be declared with data_interface wrapper. The <instruction> key can be passed in kwargs.
+        """
+        self.steps = [self._prepare_step(step) for step in steps]
+        self.groups = self._fuse_steps(self.steps)
+
+    def __call__(
+            self,
+            data: dict,
+            copy_on_write: bool = False,
+            workers: int = None,
+            executor: str = None
+    ) -> dict:
+        """ Processes the dataset.
+
+        Args:
+            data (dict): Dataset package in Preprocessor format.
+            copy_on_write (bool): Copy mode of the passed dataset, see data_interface.
+            workers (int): Number of workers, defaults to global ExecutorSettings.
+            executor (str): "process" or "thread" pool, defaults to global ExecutorSettings.
+
+        Returns:
+            (dict): Processed dataset.
+        """
+        if workers is None:
+            workers = ExecutorSettings.workers
+        if executor is None:
+            executor = ExecutorSettings.executor
+
+        # The dataset is copied once, next groups work on folds owned by the pipeline
+        data = copy_folds(data=data, copy_on_write=copy_on_write)
+        for instruction, group in self.groups:
+            data = process_fold_by_fold(
+                function=FusedSteps(group),
+                instruction=instruction,
+                data=data,
+                updated_kwargs={},
+                batch=any(getattr(function, "batch", False) for function, _ in group),
+                workers=workers,
+                executor=executor
+            )
+        return data
+
+    @staticmethod
+    def _prepare_step(step) -> tuple:
+        """ Returns (method, instruction, updated_kwargs) of the step, method kwargs are checked before processing.
+        """
+        if isinstance(step, tuple):
+            function, kwargs = step
+        else:
+            function, kwargs = step, {}
+        if not hasattr(function, "__wrapped__"):
+            raise ValueError(f"Method <{function}> is not declared with data_interface wrapper.")
+        kwargs = dict(kwargs)
+        instruction = kwargs.pop("instruction", getattr(function, "instruction", None))
+
+        default_kwargs = WrapperOperations.get_function_default_arguments(function.__wrapped__)
+        WrapperOperations.is_key_in_kwargs(default_kv=default_kwargs, **kwargs)
+        default_kwargs.update(kwargs)
+        return function, instruction, default_kwargs
+
+    @staticmethod
+    def _fuse_steps(steps: list) -> list:
+        """ Groups consecutive steps with the same instruction.
+
+        Returns:
+            (list): [(instruction, [(method, updated_kwargs), ...]), ...]
+        """
+        groups = []
+        for function, instruction, kwargs in steps:
+            if groups and Pipeline._is_same_instruction(groups[-1][0], instruction):
+                groups[-1][1].append((function, kwargs))
+            else:
+                groups.append((instruction, [(function, kwargs)]))
+        return groups
+
+    @staticmethod
+    def _is_same_instruction(instruction_a, instruction_b) -> bool:
+        if instruction_a is instruction_b:
+            return True
+        if instruction_a is None or instruction_b is None:
+            return False
+        return (
+            instruction_a.get_instructions_type() == instruction_b.get_instructions_type()
+            and instruction_a.get_instructions() == instruction_b.get_instructions()
+        )
+
+
+class FusedSteps:
+    """ Processing method composed of fused pipeline steps. Picklable, if the steps are declared at module level.
+    """
+
+    def __init__(self, steps: list):
+        """
+        Args:
+            steps (list): [(method, updated_kwargs), ...]
+        """
+        self.steps = steps
+
+    def __call__(self, **data_dict):
+        result = None
+        for idx, (function, kwargs) in enumerate(self.steps):
+            if np.ndim(data_dict.get("y")) == 2 and not getattr(function, "batch", False):
+                result = self._call_row_by_row(function, kwargs, data_dict)
+            else:
+                # Call the method itself, not its wrapper
+                result = getattr(function, "__wrapped__", function)(**{**kwargs, **data_dict})
+            if isinstance(result, tuple) and idx < len(self.steps) - 1:
+                raise ValueError(
+                    f"Step <{function.__name__}> returns multiple outputs, it can be only the last step of "
+                    f"the instruction group.")
+            # Result of the step becomes the signal of the next one, other unpacked data (eg. x-axis) is kept
+            data_dict = {**data_dict, "y": result}
+        return result
+
+    @staticmethod
+    def _call_row_by_row(function, kwargs: dict, data_dict: dict):
+        """ Calls per-row method on every row of the passed block.
+        """
+        function = getattr(function, "__wrapped__", function)
+        Y = data_dict.get("y")
+        X = data_dict.get("x")
+        rows = (
+            function(**{**kwargs, **data_dict, "y": y, **({"x": X[idx]} if np.ndim(X) == 2 else {})})
+            for idx, y in enumerate(Y)
+        )
+        result = WrapperOperations.collect_rows(rows, len(Y))
+        if isinstance(result, list) and result and isinstance(result[0], tuple):
+            # Multiple outputs, return them the same way as batch methods do
+            return tuple(np.asarray(output) for output in zip(*result))
+        return result
@@ -1,10 +1,10 @@
 
 import numpy as np
 
-from scipy import sparse
-from scipy.sparse.linalg import spsolve
+from functools import lru_cache
 
-from BaselineRemoval import BaselineRemoval
+from scipy import sparse
+from scipy.linalg import solveh_banded
 
 from src.processing.format.data_wrapper import data_interface
 from src.processing.format.data_wrapper_constants import DataFoldsConstants
@@ -35,6 +35,10 @@ class Baseline:
         "both",
     ]
     _OUTPUT_DEFAULT = _OUTPUT_AVAILABLE[1]
+    _WARM_START_AVAILABLE = [
+        "median",
+        "previous",
+    ]
 
     @staticmethod
     def _baseline_operation_output(
@@ -67,66 +71,334 @@ class Baseline:
             raise ValueError(f"Invalid baseline operation output format: {output}")
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y)
+    @lru_cache(maxsize=32)
+    def _als_penalty_band(
+            length: int,
+            lam: float
+    ) -> np.ndarray:
+        """ Returns the lam * D * D^T penalty of ALS method in lower banded form (see scipy.linalg.solveh_banded).
+
+        Bands are padded with zeros at the end of the signal, so the band of many signals of the same length can be
+        stacked into a single block-diagonal system.
+
+        Args:
+            length: Signal length.
+            lam: Smoothness parameter.
+
+        Returns:
+            (np.ndarray): Read-only (3, length) band: main diagonal, first and second subdiagonal.
+        """
+        difference_matrix = sparse.diags([1, -2, 1], [0, -1, -2], shape=(length, length - 2))
+        penalty = lam * difference_matrix.dot(difference_matrix.transpose())
+        band = np.zeros((3, length))
+        for offset in range(3):
+            band[offset, :length - offset] = penalty.diagonal(-offset)
+        band.flags.writeable = False
+        return band
+
+    @staticmethod
+    def _als_solve(
+            Y: np.ndarray,
+            lam: float,
+            p: float,
+            iterations: int,
+            tolerance: float = None,
+            weights: np.ndarray = None
+    ) -> tuple:
+        """ ALS iterations on a (n_samples, n_points) block.
+
+        All the signals still iterating are solved as a single block-diagonal banded system (banded Cholesky,
+        LAPACK pbsv), converged signals are removed from the system.
+
+        Args:
+            Y: Signals block.
+            lam: Smoothness parameter.
+            p: Asymmetry parameter.
+            iterations: Maximum number of iterations.
+            tolerance: Fraction of points with changed weights, below which the signal is converged.
+                None - all the iterations are done.
+            weights: Initial weights block, ones by default.
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray): Baselines, final weights and number of iterations per signal.
+        """
+        samples, length = Y.shape
+        weights = np.ones(Y.shape) if weights is None else np.array(weights, dtype=float)
+        baseline = np.zeros(Y.shape)
+        counts = np.zeros(samples, dtype=int)
+        # Precompute this term since it does not depend on "weights"
+        penalty_band = Baseline._als_penalty_band(length, float(lam))
+        active = np.arange(samples)
+
+        for i in range(iterations):
+            Y_active = Y[active]
+            weights_active = weights[active]
+            # Only the main diagonal depends on weights
+            band = np.tile(penalty_band, len(active))
+            band[0] += weights_active.ravel()
+            baseline_active = solveh_banded(
+                band, (weights_active * Y_active).ravel(), lower=True, overwrite_ab=True, check_finite=False
+            ).reshape(Y_active.shape)
+            baseline[active] = baseline_active
+            counts[active] += 1
+
+            weights_updated = p * (Y_active > baseline_active) + (1 - p) * (Y_active < baseline_active)
+            weights[active] = weights_updated
+            if tolerance is not None:
+                changed = np.mean(weights_updated != weights_active, axis=1)
+                active = active[changed > tolerance]
+                if not len(active):
+                    break
+
+        return baseline, weights, counts
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True, dependent_kwargs=("warm_start",))
     def als_optimized(
             output: str = _OUTPUT_DEFAULT,
             y: np.ndarray = None,
             lam=1000,
             p=0.1,
             iterations=10,
+            tolerance: float = None,
+            warm_start: str = None,
+            return_iterations: bool = False
     ):
         """ Asymmetric least squares as baseline removal.
         Estimate baseline using optimized version of ALS (Asymmetric Least Squares).
         Based on article: "Baseline Correction with Asymmetric Least Squares Smoothing,
             2005.09.21, Paul H. C. Eilers, Hans F.M. Boelens"
 
+        The system is pentadiagonal and positive definite, all the signals of the block are solved at once as a single
+        block-diagonal banded system (banded Cholesky, LAPACK pbsv).
+
+        Args:
+            output (str): Specifies output format.
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            lam (float): Defines filter of baseline function. In range: [10^2:10^9]
+            p (float): Defines asymmetry of baseline function. In range: [0.001:0.1]
+            iterations (int): Maximum number of algorithm iterations, >0.
+            tolerance (float): Early stopping, the signal is converged if the fraction of points with changed weights
+                is not above the tolerance. With 0 the result is the same as for the full number of iterations.
+                None - all the iterations are done.
+            warm_start (str): Initial weights of the block signals:
+                None - ones,
+                "median" - weights of the converged block median signal,
+                "previous" - final weights of the previous signal (signals are solved one by one).
+                Not used for a single 1D signal.
+            return_iterations (bool): Return the number of iterations done per signal as the last element
+                of the output tuple.
+
+        Returns:
+            (np.ndarray) or (np.ndarray, np.ndarray) or with iterations: (..., np.ndarray)
+        """
+        y = np.asarray(y, dtype=float)
+        Y = np.atleast_2d(y)
+        _settings = {"lam": lam, "p": p, "iterations": iterations, "tolerance": tolerance}
+
+        if warm_start is None or y.ndim == 1:
+            baseline, _, counts = Baseline._als_solve(Y, **_settings)
+        elif warm_start == Baseline._WARM_START_AVAILABLE[0]:
+            _, weights_median, _ = Baseline._als_solve(np.median(Y, axis=0, keepdims=True), **_settings)
+            baseline, _, counts = Baseline._als_solve(
+                Y, weights=np.repeat(weights_median, len(Y), axis=0), **_settings)
+        elif warm_start == Baseline._WARM_START_AVAILABLE[1]:
+            baseline = np.zeros(Y.shape)
+            counts = np.zeros(len(Y), dtype=int)
+            weights = None
+            for idx in range(len(Y)):
+                baseline[idx:idx + 1], weights, counts[idx:idx + 1] = Baseline._als_solve(
+                    Y[idx:idx + 1], weights=weights, **_settings)
+        else:
+            raise ValueError(f"Invalid warm start: {warm_start}. Available: {Baseline._WARM_START_AVAILABLE}")
+
+        baseline = baseline.reshape(y.shape)
+        result = Baseline._baseline_operation_output(y=y, baseline=baseline, output=output)
+        if return_iterations:
+            counts = counts if y.ndim > 1 else counts[0]
+            return (*result, counts) if isinstance(result, tuple) else (result, counts)
+        return result
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.calorimetry.config_y, batch=True)
+    def als_segmented(
+            output: str = _OUTPUT_DEFAULT,
+            y: np.ndarray = None,
+            lam=1000,
+            p=0.1,
+            iterations=10,
+            tolerance: float = None,
+            segment_size: int = 20000,
+            overlap: int = 2000
+    ):
+        """ Asymmetric least squares as baseline removal, for long traces (eg. isothermal calorimetry).
+
+        The trace is solved in overlapping segments of bounded size, baselines of consecutive segments are blended
+        with a smoothstep over the middle half of the overlap (edge points of both segments are not used), so there
+        are no steps at segment boundaries. The solver works on one segment at a time, so its memory depends only on
+        the segment size, the passed trace and the result are held whole. See als_online to process traces that do
+        not fit in memory.
+
         Args:
             output (str): Specifies output format.
-            y (np.ndarray): Signal array.
+            y (np.ndarray): Signal array, 1D trace or 2D (n_samples, n_points) block of traces.
             lam (float): Defines filter of baseline function. In range: [10^2:10^9]
             p (float): Defines asymmetry of baseline function. In range: [0.001:0.1]
-            iterations (int): Number of algorithm iterations, >0.
+            iterations (int): Maximum number of algorithm iterations, >0.
+            tolerance (float): Early stopping, see als_optimized.
+            segment_size (int): Number of points solved at once.
+            overlap (int): Number of points shared by consecutive segments, should be a few times larger than
+                the baseline features width.
 
         Returns:
             (np.ndarray) or (np.ndarray, np.ndarray)
         """
-        length = len(y)
-        difference_matrix = sparse.diags([1, -2, 1], [0, -1, -2], shape=(length, length - 2))
-        # Precompute this term since it does not depend on "weights"
-        difference_matrix = lam * difference_matrix.dot(difference_matrix.transpose())
-        weights = np.ones(length)
-        weights_diagonal = sparse.spdiags(weights, 0, length, length)
+        y = np.asarray(y, dtype=float)
+        chunks = (y[..., start:start + segment_size] for start in range(0, y.shape[-1], segment_size))
+        parts = list(Baseline.als_online(
+            chunks=chunks, output=output, lam=lam, p=p, iterations=iterations, tolerance=tolerance,
+            segment_size=segment_size, overlap=overlap))
+        if isinstance(parts[0], tuple):
+            return tuple(np.concatenate(part, axis=-1) for part in zip(*parts))
+        return np.concatenate(parts, axis=-1)
 
-        for i in range(iterations):
-            # Do not create a new matrix, just update diagonal values
-            weights_diagonal.setdiag(weights)
-            Z = weights_diagonal + difference_matrix
-            baseline = spsolve(Z, weights * y)
-            weights = p * (y > baseline) + (1 - p) * (y < baseline)
+    @staticmethod
+    def als_online(
+            chunks,
+            output: str = _OUTPUT_DEFAULT,
+            lam=1000,
+            p=0.1,
+            iterations=10,
+            tolerance: float = None,
+            segment_size: int = 20000,
+            overlap: int = 2000
+    ):
+        """ Online version of als_segmented.
 
-        return Baseline._baseline_operation_output(y=y, baseline=baseline, output=output)
+        Consecutive chunks of the trace (of any length, eg. slices of a memory-mapped file or data acquired
+        on the fly) are consumed from an iterator, processed parts are yielded as soon as the segment is solved.
+        Last <overlap> points of every segment are held back until blended with the next one. Unsolved points are
+        buffered together with the incoming chunk, so at most segment_size + chunk length points are held
+        in memory: pass chunks not longer than the segment to bound it.
+
+        Example:
+            trace = np.load("heat_flow.npy", mmap_mode="r")
+            chunks = (trace[start:start + 10**6] for start in range(0, len(trace), 10**6))
+            for part in Baseline.als_online(chunks=chunks, lam=10**7):
+                ...
+
+        Args:
+            chunks: Iterable of consecutive parts of the trace, 1D or 2D (n_samples, n_points) blocks
+                of multiple traces.
+            output (str): Specifies output format, see als_segmented.
+            lam (float): Defines filter of baseline function.
+            p (float): Defines asymmetry of baseline function.
+            iterations (int): Maximum number of algorithm iterations, >0.
+            tolerance (float): Early stopping, see als_optimized.
+            segment_size (int): Number of points solved at once.
+            overlap (int): Number of points shared by consecutive segments, >=3.
+
+        Yields:
+            (np.ndarray) or (np.ndarray, np.ndarray): Processed consecutive parts of the trace.
+        """
+        if not 3 <= overlap < segment_size:
+            raise ValueError(f"Overlap {overlap} has to be at least 3 and smaller than segment size {segment_size}.")
+        _settings = {"lam": lam, "p": p, "iterations": iterations, "tolerance": tolerance}
+        # Weights of the next segment baseline in the overlap. Edge points of both segments (ALS edge effects)
+        # are not used, baselines are blended with smoothstep over the middle half of the overlap
+        ramp = np.clip((np.arange(overlap) + 0.5 - overlap / 4) / (overlap / 2), 0, 1)
+        ramp = ramp * ramp * (3 - 2 * ramp)
+        buffer = None
+        baseline_tail = None
+
+        def _solve_segment(segment: np.ndarray, is_last: bool):
+            nonlocal baseline_tail
+            baseline = Baseline._als_solve(np.atleast_2d(segment), **_settings)[0].reshape(segment.shape)
+            if baseline_tail is not None:
+                baseline[..., :overlap] = (1 - ramp) * baseline_tail + ramp * baseline[..., :overlap]
+            stop = segment.shape[-1] if is_last else -overlap
+            baseline_tail = None if is_last else baseline[..., -overlap:]
+            return Baseline._baseline_operation_output(y=segment[..., :stop], baseline=baseline[..., :stop],
+                                                       output=output)
+
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=float)
+            buffer = chunk if buffer is None else np.concatenate([buffer, chunk], axis=-1)
+            # The last full segment is solved when the trace ends, it has no successor to blend with
+            while buffer.shape[-1] > segment_size:
+                yield _solve_segment(buffer[..., :segment_size], is_last=False)
+                buffer = buffer[..., segment_size - overlap:]
+
+        if buffer is not None:
+            yield _solve_segment(buffer, is_last=True)
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y)
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
     def running_median_insort(
             output: str = _OUTPUT_DEFAULT,
             y: np.ndarray = None,
-            window_size: int = 3
+            window_size: int = 3,
+            mode: str = None
     ):
-        """ Running median insort as baseline removal.
+        """ Running median as baseline removal.
         Args:
             output (str): Specifies output format.
-            y (np.ndarray): Signal array.
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
             window_size (int): The length of the filter window.
+            mode (str): Edge handling, see Filter.running_median_insort.
 
         Returns:
             (np.ndarray) or (np.ndarray, np.ndarray)
         """
-        baseline = Filter.running_median_insort(y=y, window_size=window_size)
+        baseline = Filter.running_median_insort(y=y, window_size=window_size, mode=mode)
         return Baseline._baseline_operation_output(y=y, baseline=baseline, output=output)
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y)
+    @lru_cache(maxsize=32)
+    def _polynomial_basis(
+            length: int,
+            degree: int
+    ) -> np.ndarray:
+        """ Returns orthonormal basis of polynomials up to the passed degree, sampled at the signal points.
+
+        Args:
+            length: Signal length.
+            degree: Polynomial degree.
+
+        Returns:
+            (np.ndarray): Read-only (length, degree + 1) basis.
+        """
+        # Points scaled to [-1, 1] for conditioning, the basis spans the same polynomials
+        points = np.linspace(-1, 1, length)
+        basis = np.linalg.qr(np.vander(points, degree + 1, increasing=True))[0]
+        basis.flags.writeable = False
+        return basis
+
+    @staticmethod
+    def _polynomial_fit(
+            Y: np.ndarray,
+            mask: np.ndarray,
+            basis: np.ndarray,
+            basis_products: np.ndarray
+    ) -> np.ndarray:
+        """ Least squares polynomial fit of every signal of the block to its masked points.
+
+        Args:
+            Y: Signals block.
+            mask: Points used in the fit (1) or excluded (0).
+            basis: Polynomial basis (n_points, n_polynomials).
+            basis_products: Products of basis polynomials (n_points, n_polynomials ** 2), masked normal equations
+                of all the signals are calculated with a single matrix product.
+
+        Returns:
+            (np.ndarray): Fitted polynomials evaluated at all the points.
+        """
+        gram = (mask @ basis_products).reshape(len(Y), basis.shape[1], basis.shape[1])
+        coefficients = np.linalg.solve(gram, ((mask * Y) @ basis)[..., None])[..., 0]
+        return coefficients @ basis.T
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
     def improved_mod_poly(
             output: str = _OUTPUT_DEFAULT,
             y: np.ndarray = None,
@@ -136,11 +408,16 @@ class Baseline:
 
     ):
         """ Improved modified multi-polynomial fit as baseline removal.
-        Source: https://pypi.org/project/BaselineRemoval/
+        Based on article: "Automated Autofluorescence Background Subtraction Algorithm for Biomedical Raman
+            Spectroscopy, 2007, Zhao, Jianhua, Lui, Harvey, McLean, David I., Zeng, Haishan"
+        Follows implementation: https://pypi.org/project/BaselineRemoval/
+
+        All the signals of the block are fitted at once with a shared polynomial basis, every signal stops
+        iterating on its own convergence.
 
         Args:
             output (str): Specifies output format.
-            y (np.ndarray): Signal array.
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
             polynomial_degree (int): refers to polynomial degree.
             iterations (int): refers to how many iterations to run.
             gradient (float): refers to gradient for polynomial loss.
@@ -150,10 +427,39 @@ class Baseline:
         Returns:
             (np.ndarray) or (np.ndarray, np.ndarray)
         """
-        base_obj = BaselineRemoval(y)
-        baseline = base_obj.IModPoly(
-            degree=polynomial_degree,
-            repitition=iterations,
-            gradient=gradient
-        )
+        y = np.asarray(y, dtype=float)
+        Y = np.atleast_2d(y)
+        basis = Baseline._polynomial_basis(Y.shape[-1], polynomial_degree)
+        basis_products = (basis[:, :, None] * basis[:, None, :]).reshape(len(basis), -1)
+
+        # Iteration 1: fit to all the points, points above the fit + deviation are excluded from next fits
+        polynomial = Baseline._polynomial_fit(Y, np.ones(Y.shape), basis, basis_products)
+        deviation = np.std(Y - polynomial, axis=-1)
+        mask = (Y <= polynomial + deviation[:, None]).astype(float)
+        Y_work = Y.copy()
+        active = np.arange(len(Y))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(2, iterations + 1):
+                mask_active = mask[active]
+                Y_active = Y_work[active]
+                polynomial_active = Baseline._polynomial_fit(Y_active, mask_active, basis, basis_products)
+                polynomial[active] = polynomial_active
+
+                # Deviation of the points used in the fit
+                residuals = Y_active - polynomial_active
+                points = mask_active.sum(axis=-1)
+                residuals_mean = np.sum(residuals * mask_active, axis=-1) / points
+                deviation_updated = np.sqrt(
+                    np.sum(mask_active * (residuals - residuals_mean[:, None]) ** 2, axis=-1) / points)
+
+                converged = np.abs((deviation_updated - deviation[active]) / deviation_updated) < gradient
+                Y_work[active] = np.minimum(Y_active, polynomial_active + deviation_updated[:, None])
+                deviation[active] = deviation_updated
+                active = active[~converged]
+                if not len(active):
+                    break
+
+        # BaselineRemoval.IModPoly returns the signal with removed polynomial, this output format is kept
+        baseline = (Y - polynomial).reshape(y.shape)
         return Baseline._baseline_operation_output(y=y, baseline=baseline, output=output)
@@ -1,51 +1,279 @@
-
 import numpy as np
 
+from functools import lru_cache
+
+from scipy import sparse
+
 from src.processing.format.data_wrapper import data_interface
 from src.processing.format.data_wrapper_constants import DataFoldsConstants
 
 
 class Dimensions:
+    _RESAMPLE_METHODS_AVAILABLE = [
+        "linear",
+        "cubic",
+        "lanczos",
+    ]
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_multi_y)
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_multi_y, batch=True)
     def cut_in_range(
             y: np.ndarray or list = None,
             cut_range: (int, int) = (200, -100),
-            return_middle: bool = True
+            return_middle: bool = True,
+            axis: np.ndarray = None
     ) -> np.ndarray or list:
         """ Get region or its outer areas from the passed array.
 
         Args:
-            y (np.ndarray): The data to be cut off.
+            y (np.ndarray): The data to be cut off, 1D signal or 2D (n_samples, n_points) block.
             cut_range (int, int): Cut off range.
                 If expressed as negative, refer to the distance from the end.
+                If axis is passed, range is expressed in axis values (eg. ppm), boundaries are resolved to
+                the closest axis points and both of them are included in the region.
             return_middle: Return middle or outer areas of the passed region.
-                True - returns middle region,
+                True - returns middle region (view of the passed array),
                 False - outer areas region (inversion).
+            axis (np.ndarray): Monotonic x-axis shared by all the signals (eg. chemical shift), used to cut
+                by values. With config_multi_y the axis column itself is cut with the same positions.
 
         Returns:
             (np.ndarray) | (list)
 
         """
-        position_left = cut_range[0] 
+        y = np.asarray(y)
+        length = y.shape[-1]
+        if axis is not None:
+            position_left, position_right = Dimensions._get_value_positions(axis, [cut_range], length)[0]
+        else:
+            position_left, position_right = Dimensions._get_positions(cut_range, length)
+
+        if return_middle:
+            return y[..., position_left:position_right]
+        else:
+            if position_left == 0:
+                return y[..., position_right:]
+            elif position_right == length:
+                return y[..., :position_left]
+            else:
+                return np.concatenate([y[..., :position_left], y[..., position_right:]], axis=-1)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_multi_y, batch=True)
+    def cut_regions(
+            y: np.ndarray or list = None,
+            regions: list = None,
+            return_middle: bool = True,
+            axis: np.ndarray = None
+    ) -> np.ndarray:
+        """ Get many regions from the passed array at once.
+
+        Regions are resolved once, the whole block is gathered with a single index array. Selected regions are
+        concatenated in the passed order.
+
+        Args:
+            y (np.ndarray): The data to be cut off, 1D signal or 2D (n_samples, n_points) block.
+            regions (list): Sequence of cut off ranges, see cut_in_range <cut_range>.
+            return_middle: Return regions or all the points outside of them.
+            axis (np.ndarray): Monotonic x-axis shared by all the signals, used to cut by values, see cut_in_range.
+
+        Returns:
+            (np.ndarray)
+
+        """
+        if regions is None:
+            raise ValueError("Cut off regions <regions> have to be passed.")
+        y = np.asarray(y)
+        length = y.shape[-1]
+        if axis is not None:
+            positions = Dimensions._get_value_positions(axis, regions, length)
+        else:
+            positions = tuple(Dimensions._get_positions(cut_range, length) for cut_range in regions)
+        return np.take(y, Dimensions._get_regions_index(positions, length, return_middle), axis=-1)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_yx_of_x, batch=True)
+    def resample(
+            y: np.ndarray = None,
+            x: np.ndarray = None,
+            axis_target: np.ndarray = None,
+            method: str = _RESAMPLE_METHODS_AVAILABLE[0],
+            lanczos_window: int = 3
+    ) -> (np.ndarray, np.ndarray):
+        """ Interpolates signals onto the target x-axis.
+
+        Interpolation weights are calculated once per source axis (and cached) as a sparse (n_points, n_target)
+        matrix, all the signals sharing the axis are resampled with a single sparse product. Used with config_yx_of_x
+        instruction, both signal and x-axis columns are updated. Values outside the source axis are set to the closest
+        edge value (as numpy.interp does).
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            x (np.ndarray): Monotonic source x-axis, 1D shared by all the signals or 2D (n_samples, n_points) block.
+            axis_target (np.ndarray): Target x-axis.
+            method (str): Interpolation method:
+                "linear" - linear interpolation,
+                "cubic" - local cubic (Lagrange) interpolation on the 4 closest points, non-uniform axes are supported,
+                "lanczos" - band-limited (windowed sinc) interpolation, assumes evenly spaced source axis.
+            lanczos_window (int): Lanczos kernel half-width, in source points.
+
+        Returns:
+            (np.ndarray, np.ndarray): Resampled signals and target axis (2D block of rows, if 2D block was passed).
+        """
+        if axis_target is None:
+            raise ValueError("Target axis <axis_target> has to be passed.")
+        if method not in Dimensions._RESAMPLE_METHODS_AVAILABLE:
+            raise ValueError(f"Method <{method}> not available, choose from {Dimensions._RESAMPLE_METHODS_AVAILABLE}.")
+        y = np.asarray(y, dtype=float)
+        x = np.asarray(x, dtype=float)
+        axis_target = np.asarray(axis_target, dtype=float)
+        if x.ndim > 1 and (x == x[..., :1, :]).all():
+            # The same axis for all the signals
+            x = x[0]
+
+        if x.ndim == 1:
+            weights = Dimensions._get_resample_weights(x.tobytes(), axis_target.tobytes(), method, lanczos_window)
+            result = y @ weights
+        else:
+            # Rows with equal axes share their weights
+            result = np.empty(y.shape[:-1] + axis_target.shape)
+            axes, inverse = np.unique(x, axis=0, return_inverse=True)
+            for idx, axis in enumerate(axes):
+                rows = inverse.reshape(-1) == idx
+                weights = Dimensions._get_resample_weights(
+                    axis.tobytes(), axis_target.tobytes(), method, lanczos_window)
+                result[rows] = y[rows] @ weights
+
+        if y.ndim > 1:
+            return result, np.broadcast_to(axis_target, result.shape)
+        return result, axis_target
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _get_resample_weights(
+            axis_bytes: bytes,
+            axis_target_bytes: bytes,
+            method: str,
+            lanczos_window: int
+    ) -> sparse.csr_matrix:
+        """ Returns cached sparse (n_points, n_target) interpolation matrix.
+        """
+        axis_sorted, is_reversed = Dimensions._get_axis_index(axis_bytes)
+        target = np.frombuffer(axis_target_bytes, dtype=float)
+        length = len(axis_sorted)
+        # Fractional positions of the target points on the source axis
+        positions = np.interp(target, axis_sorted, np.arange(length, dtype=float))
+
+        if method == "linear" or length < 4:
+            left = np.clip(np.floor(positions).astype(np.int64), 0, max(length - 2, 0))
+            fraction = positions - left
+            columns = np.stack([left, np.minimum(left + 1, length - 1)], axis=-1)
+            weights = np.stack([1 - fraction, fraction], axis=-1)
+        elif method == "cubic":
+            left = np.clip(np.floor(positions).astype(np.int64) - 1, 0, length - 4)
+            columns = left[:, None] + np.arange(4)
+            nodes = axis_sorted[columns]
+            points = np.clip(target, axis_sorted[0], axis_sorted[-1])[:, None]
+            weights = np.ones(columns.shape)
+            for k in range(4):
+                for j in range(4):
+                    if j != k:
+                        weights[:, k] *= (points[:, 0] - nodes[:, j]) / (nodes[:, k] - nodes[:, j])
+        else:
+            offsets = np.arange(-lanczos_window + 1, lanczos_window + 1)
+            columns_raw = np.floor(positions).astype(np.int64)[:, None] + offsets
+            distance = positions[:, None] - columns_raw
+            weights = np.sinc(distance) * np.sinc(distance / lanczos_window)
+            weights /= weights.sum(axis=-1, keepdims=True)
+            # Points outside the axis are replaced by the edge points
+            columns = np.clip(columns_raw, 0, length - 1)
+
+        if is_reversed:
+            columns = length - 1 - columns
+        rows = np.broadcast_to(np.arange(len(target))[:, None], columns.shape)
+        # Duplicated (clipped) columns are summed
+        matrix = sparse.csr_matrix(
+            (weights.reshape(-1), (columns.reshape(-1), rows.reshape(-1))), shape=(length, len(target)))
+        return matrix
+
+    @staticmethod
+    def _get_positions(
+            cut_range: (int, int),
+            length: int
+    ) -> (int, int):
+        """ Returns (left, right) slice positions of the region expressed in array positions.
+        """
+        position_left = cut_range[0]
         position_right = cut_range[-1]
 
         if position_left <= 0:
-            position_left = len(y) + position_left
+            position_left = length + position_left
         if position_right <= 0:
-            position_right = len(y) + position_right
+            position_right = length + position_right
         if position_left >= position_right:
             position_left, position_right = position_right, position_left
-        if position_left > len(y) or position_right > len(y):
-            raise ValueError(f"One of values ({position_left},{position_right}) is out of array dim. [{len(y)}].")
+        if position_left > length or position_right > length:
+            raise ValueError(f"One of values ({position_left},{position_right}) is out of array dim. [{length}].")
+        return position_left, position_right
 
+    @staticmethod
+    def _get_value_positions(
+            axis: np.ndarray,
+            regions: list,
+            length: int
+    ) -> tuple:
+        """ Returns (left, right) slice positions of the regions expressed in axis values.
+
+        Boundaries are resolved with binary search to the closest axis points.
+        """
+        axis = np.asarray(axis, dtype=float)
+        if axis.ndim > 1:
+            # Axis block of the fold (eg. broadcast view of the shared axis)
+            axis = axis[0]
+        if len(axis) != length:
+            raise ValueError(f"Axis length {len(axis)} does not match the signal length {length}.")
+        axis_sorted, is_reversed = Dimensions._get_axis_index(axis.tobytes())
+
+        values = np.asarray(regions, dtype=float).reshape(-1)
+        positions = np.clip(np.searchsorted(axis_sorted, values), 1, length - 1)
+        # Closest of the two neighbouring points
+        positions -= values - axis_sorted[positions - 1] < axis_sorted[positions] - values
+        if length == 1:
+            positions[:] = 0
+        if is_reversed:
+            positions = length - 1 - positions
+
+        positions = np.sort(positions.reshape(-1, 2), axis=-1)
+        return tuple((int(left), int(right) + 1) for left, right in positions)
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _get_axis_index(axis_bytes: bytes) -> (np.ndarray, bool):
+        """ Returns cached ascending (read-only) axis and information whether the passed axis is descending.
+        """
+        axis = np.frombuffer(axis_bytes, dtype=float)
+        steps = np.diff(axis)
+        if (steps >= 0).all():
+            return axis, False
+        if (steps <= 0).all():
+            return axis[::-1], True
+        raise ValueError("Axis has to be monotonic to cut regions by values.")
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _get_regions_index(
+            positions: tuple,
+            length: int,
+            return_middle: bool
+    ) -> np.ndarray:
+        """ Returns cached (read-only) index of points selected by the regions.
+        """
         if return_middle:
-            return y[position_left:position_right]
+            index = np.concatenate([np.arange(left, right) for left, right in positions])
         else:
-            if position_left == 0:
-                return y[position_right:]
-            elif position_right == 0:
-                return y[:position_left]
-            else:
-                return np.concatenate([y[:position_left], y[position_right:]])
+            mask = np.ones(length, dtype=bool)
+            for left, right in positions:
+                mask[left:right] = False
+            index = np.flatnonzero(mask)
+        index.flags.writeable = False
+        return index
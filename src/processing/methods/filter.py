@@ -1,12 +1,16 @@
 
 import numpy as np
+import pandas as pd
 
-from scipy.signal import savgol_filter
-from scipy.signal.windows import general_gaussian
+from numpy.lib.stride_tricks import sliding_window_view
+
+from functools import lru_cache
+from math import factorial
 
-from collections import deque
-from bisect import insort, bisect_left
-from itertools import islice
+from scipy.fft import dct, idct
+from scipy.signal import savgol_coeffs
+from scipy.signal.windows import general_gaussian
+from scipy.ndimage import convolve1d, median_filter
 
 from src.processing.format.data_wrapper import data_interface
 from src.processing.format.data_wrapper_constants import DataFoldsConstants
@@ -16,72 +20,240 @@ class Filter:
     """
     A preprocessor class dedicated to spectrum processing methods.
     """
+    # Windows up to this size are filtered with scipy.ndimage (O(window_size) per point), wider with skiplist
+    _MEDIAN_FILTER_MAX_WINDOW = 24
+    # scipy.ndimage edge modes names in numpy.pad
+    _PAD_MODES = {
+        "reflect": "symmetric",
+        "mirror": "reflect",
+        "nearest": "edge",
+    }
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y)
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
     def sav_gol(
             y: np.ndarray = None,
             window_size: int = 151,
             polyorder: int = 5,
             derivative: int = 0,
+            delta: float = 1.0,
+            x: np.ndarray = None
     ) -> np.ndarray:
         """ Apply a Savitzky-Golay filter to an array.
         Example Method source:
         https://docs.scipy.org/doc/scipy/reference/generated/scipy.signal.savgol_filter.html
 
+        Filter coefficients are cached per settings, the whole block is convolved at once. Edges are fitted as in
+        savgol_filter "interp" mode.
+
         Args:
-            y (np.ndarray): The data to be filtered.
+            y (np.ndarray): The data to be filtered, 1D signal or 2D (n_samples, n_points) block.
             window_size (int): The samples number affected by filter in one iteration.
             polyorder (int): The order of the polynomial used to fit the
                 samples. Polyorder must be smaller than size of window.
             derivative (int): The order of the derivative applied to filtered signal, pass >1 to get effect.
+            delta (float): The spacing of the samples, used for derivatives if x-axis is not passed.
+            x (np.ndarray): X-axis, 1D shared by all the signals or 2D (n_samples, n_points) block, passed with
+                Y_OF_X instruction (eg. DataFoldsConstants.spectro.ftir.config_y_of_x). Polynomials are fitted
+                to the real x positions, non-uniform axes are supported.
 
         Returns:
             (np.ndarray): The filtered data.
         """
-        return savgol_filter(
-            x=y,
-            window_length=window_size,
-            polyorder=polyorder,
-            deriv=derivative
-        )
+        y = np.asarray(y, dtype=float)
+        if window_size > y.shape[-1]:
+            raise ValueError(f"Window size {window_size} is larger than the signal length {y.shape[-1]}.")
+
+        if x is None:
+            coefficients = Filter._savgol_coefficients(window_size, polyorder, derivative, float(delta))
+            result = convolve1d(y, coefficients, axis=-1, mode="constant")
+            # Fit polynomials to the first and the last window
+            half = window_size // 2
+            if half:
+                edge_left, edge_right = Filter._savgol_edges(window_size, polyorder, derivative, float(delta))
+                result[..., :half] = y[..., :window_size] @ edge_left.T
+                result[..., -half:] = y[..., -window_size:] @ edge_right.T
+            return result
+
+        x = np.asarray(x, dtype=float)
+        if x.ndim > 1 and (x == x[..., :1, :]).all():
+            # The same axis for all the signals
+            x = x[0]
+        if x.ndim == 1:
+            return Filter._savgol_apply(y, Filter._savgol_matrix(x.tobytes(), window_size, polyorder, derivative))
+        return np.stack([
+            Filter._savgol_apply(y_row, Filter._savgol_matrix(x_row.tobytes(), window_size, polyorder, derivative))
+            for y_row, x_row in zip(y, x)
+        ])
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _savgol_coefficients(
+            window_size: int,
+            polyorder: int,
+            derivative: int,
+            delta: float
+    ) -> np.ndarray:
+        """ Returns cached Savitzky-Golay convolution coefficients (read-only).
+        """
+        coefficients = savgol_coeffs(window_size, polyorder, deriv=derivative, delta=delta)
+        coefficients.flags.writeable = False
+        return coefficients
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _savgol_edges(
+            window_size: int,
+            polyorder: int,
+            derivative: int,
+            delta: float
+    ) -> tuple:
+        """ Returns cached linear operators of the polynomial fit to the first and the last window of the signal.
+
+        Returns:
+            (np.ndarray, np.ndarray): (half, window_size) matrices, evaluating the fit (or its derivative)
+                at the first and the last half-window points.
+        """
+        half = window_size // 2
+        # Window positions centered and scaled to [-1, 1] for conditioning
+        scale = max(half, 1)
+        positions = (np.arange(window_size) - half) / scale
+        powers = np.arange(polyorder + 1)
+        # Least squares polynomial coefficients as a linear function of the window values
+        fit = np.linalg.pinv(positions[:, None] ** powers)
+        # d-th derivative of t^k: k! / (k - d)! * t^(k - d)
+        factors = np.array([factorial(k) / factorial(k - derivative) if k >= derivative else 0. for k in powers])
+        edges = []
+        for points in (positions[:half], positions[window_size - half:]):
+            derivative_vandermonde = factors * points[:, None] ** np.maximum(powers - derivative, 0)
+            edge = derivative_vandermonde @ fit / (scale * delta) ** derivative
+            edge.flags.writeable = False
+            edges.append(edge)
+        return tuple(edges)
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _savgol_matrix(
+            x_bytes: bytes,
+            window_size: int,
+            polyorder: int,
+            derivative: int
+    ) -> np.ndarray:
+        """ Returns Savitzky-Golay coefficients for every point of a (non-uniform) x-axis.
+
+        For every point a polynomial is fitted to the window around it (windows of the edge points are shifted
+        inside the signal), coefficients are expressed in local coordinates, so the fit (or its derivative)
+        at the point is a linear combination of the window values.
+
+        Args:
+            x_bytes: X-axis buffer (float64), used as cache key.
+
+        Returns:
+            (np.ndarray): Read-only (n_points, window_size) coefficients, window of the point i starts
+                at i - (window_size - 1) // 2 (shifted inside the signal at the edges).
+        """
+        x = np.frombuffer(x_bytes, dtype=float)
+        length = len(x)
+        half = window_size // 2
+        starts = np.clip(np.arange(length) - (window_size - 1) // 2, 0, length - window_size)
+        centers = x.copy()
+        if window_size % 2 == 0 and half:
+            # As in savgol_filter, even windows of the interior points are evaluated between their middle points
+            centers[half:length - half] = (x[half:length - half] + x[half + 1:length - half + 1]) / 2
+        local = x[starts[:, None] + np.arange(window_size)] - centers[:, None]
+        # Scale local coordinates for conditioning
+        scale = np.abs(local).max(axis=1, keepdims=True)
+        scale[scale == 0] = 1.0
+        vandermonde = (local / scale)[..., None] ** np.arange(polyorder + 1)
+        if derivative > polyorder:
+            coefficients = np.zeros((length, window_size))
+        else:
+            coefficients = np.linalg.pinv(vandermonde)[:, derivative, :]
+            coefficients = coefficients * factorial(derivative) / scale ** derivative
+        coefficients.flags.writeable = False
+        return coefficients
+
+    @staticmethod
+    def _savgol_apply(
+            y: np.ndarray,
+            coefficients: np.ndarray
+    ) -> np.ndarray:
+        """ Applies per-point coefficients to the signals block.
+        """
+        window_size = coefficients.shape[1]
+        lead = (window_size - 1) // 2
+        # Interior points use consecutive windows, edge points the first and the last one
+        windows = sliding_window_view(y, window_size, axis=-1)
+        result = np.empty(y.shape)
+        result[..., lead:lead + windows.shape[-2]] = np.einsum(
+            "...kw,kw->...k", windows, coefficients[lead:lead + windows.shape[-2]])
+        result[..., :lead] = windows[..., 0, :] @ coefficients[:lead].T
+        result[..., lead + windows.shape[-2]:] = windows[..., -1, :] @ coefficients[lead + windows.shape[-2]:].T
+        return result
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y)
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
     def running_median_insort(
             y: np.ndarray = None,
-            window_size: int = 3
-    ):
-        """ Apply a running median insort to an array.
-        Contributed by Peter Otten.
+            window_size: int = 3,
+            mode: str = None
+    ) -> np.ndarray:
+        """ Apply a running median to an array.
+        Originally a pure Python insort version contributed by Peter Otten, the whole block is now filtered at once
+        with scipy.ndimage.median_filter.
 
         Args:
-            y (np.ndarray): The data to be filtered.
+            y (np.ndarray): The data to be filtered, 1D signal or 2D (n_samples, n_points) block.
             window_size (int): The samples number affected by filter in one iteration.
+            mode (str): Edge handling.
+                None - causal window ending at the current point, the first points are medians of the growing
+                    window (insort version output),
+                "reflect", "nearest", "mirror", "wrap", "constant" - window centered on the current point,
+                    signal extended as in scipy.ndimage.
 
         Returns:
             (np.ndarray): The filtered data. Same shape as spectrum.
         """
+        y = np.asarray(y)
+        if window_size > Filter._MEDIAN_FILTER_MAX_WINDOW:
+            return Filter._running_median_skiplist(y, window_size, mode)
+
+        size = [1] * (y.ndim - 1) + [window_size]
+        if mode is not None:
+            return median_filter(y, size=size, mode=mode)
 
-        y = iter(y)
-        d = deque()
-        s = []
-        result = []
-        for item in islice(y, window_size):
-            d.append(item)
-            insort(s, item)
-            result.append(s[len(d) // 2])
-        m = window_size // 2
-        for item in y:
-            old = d.popleft()
-            d.append(item)
-            del s[bisect_left(s, old)]
-            insort(s, item)
-            result.append(s[m])
+        # Shift the window to the causal position: points [i - window_size + 1, i]
+        origin = [0] * (y.ndim - 1) + [(window_size - 1) // 2]
+        result = median_filter(y, size=size, origin=origin, mode="nearest")
+        # Window is not filled yet for the first points, take the upper median of the available ones
+        for idx in range(min(window_size - 1, y.shape[-1])):
+            result[..., idx] = np.partition(y[..., :idx + 1], (idx + 1) // 2, axis=-1)[..., (idx + 1) // 2]
         return result
 
     @staticmethod
-    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y)
+    def _running_median_skiplist(
+            y: np.ndarray,
+            window_size: int,
+            mode: str = None
+    ) -> np.ndarray:
+        """ Running median of wide windows, O(log(window_size)) per point (pandas rolling skiplist).
+
+        Upper median of the window (the "higher" 0.5 quantile) gives the same output as the insort version
+        and scipy.ndimage.median_filter.
+        """
+        Y = np.atleast_2d(y)
+        if mode is not None:
+            # Extend the signal, so the causal window of the extended signal is centered on the original points
+            pad_width = ((0, 0), (window_size // 2, (window_size - 1) // 2))
+            Y = np.pad(Y, pad_width, mode=Filter._PAD_MODES.get(mode, mode))
+        result = pd.DataFrame(Y.T).rolling(window_size, min_periods=1).quantile(0.5, interpolation="higher")
+        result = result.to_numpy(dtype=np.result_type(y.dtype, float)).T
+        if mode is not None:
+            result = result[:, window_size - 1:]
+        return result.reshape(y.shape)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
     def fourier(
             y: np.ndarray = None,
             sigma: int = 40,
@@ -91,7 +263,7 @@ class Filter:
         """ Fourier-transform based filtering.
 
         Args:
-            y (np.ndarray): The data to be filtered.
+            y (np.ndarray): The data to be filtered, 1D signal or 2D (n_samples, n_points) block.
             sigma (int): standard deviation of windows (in pixels).
             m (int): General gaussian power level,
                 for 1 is conventional Gaussian,
@@ -104,20 +276,42 @@ class Filter:
             (np.ndarray): The filtered data or its derivative.
         """
 
-        X = np.array(y).T
-        XX = np.hstack((X, np.flip(X)))
-        win = np.roll(general_gaussian(XX.shape[0], m, sigma), XX.shape[0] // 2)
-        fXX = np.fft.fft(XX)
-        XXf = np.real(np.fft.ifft(fXX * win))[:X.shape[0]]
+        X = np.asarray(y)
+        length = X.shape[-1]
+        # Spectrum of the mirrored signal [X, flip(X)] is its DCT-II (up to a phase factor), the filtered mirrored
+        # signal stays mirrored, so the whole filter is computed with real transforms of half the length
+        fX = dct(X, type=2, axis=-1)
+        win = Filter._fourier_window(length, m, 0.5 * sigma if derivative else sigma, derivative=derivative)
+        return idct(fX * win, type=2, axis=-1)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _fourier_window(
+            length: int,
+            m: int,
+            sigma: float,
+            derivative: bool = False
+    ) -> np.ndarray:
+        """ Returns general gaussian window of Fourier filter for DCT-II frequencies of the signal.
+
+        The window is defined for the mirrored signal (2 * length points). Only its symmetric part affects the real
+        filtered signal, so the window is symmetrized: w[k] = (w[k] + w[-k]) / 2. For derivative the window is
+        multiplied by -q^2.
+
+        Args:
+            length: Signal length.
+            m: General gaussian power level.
+            sigma: Standard deviation of window (in pixels).
+            derivative: Include -q^2 derivative factor.
 
+        Returns:
+            (np.ndarray): Read-only window of length frequencies.
+        """
+        length_mirrored = 2 * length
+        win = np.roll(general_gaussian(length_mirrored, m, sigma), length)
+        win = 0.5 * (win + np.roll(win[::-1], 1))
         if derivative:
-            qq = 2 * np.pi * np.arange(-XX.shape[0] // 2, XX.shape[0] // 2, 1) / XX.shape[0]
-            # Define a new window
-            win_derivative = np.roll(general_gaussian(XX.shape[0], m, 0.5 * sigma), XX.shape[0] // 2)
-            # Calculate FFT and multiply by -q^2
-            f2XX = np.roll(np.roll(fXX, -XX.shape[0] // 2) * (-qq ** 2), XX.shape[0] // 2)
-            # Multiply by the window and inverse FFT
-            XXf2 = np.real(np.fft.ifft(f2XX * win_derivative))[:X.shape[0]]
-            return XXf2
-        else:
-            return XXf
+            win = win * -(2 * np.pi * np.fft.fftfreq(length_mirrored)) ** 2
+        win = win[:length].copy()
+        win.flags.writeable = False
+        return win
@@ -0,0 +1,134 @@
+import numpy as np
+
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+from src.processing.format.data_wrapper_operations import WrapperOperations
+from src.processing.format.constants.constants_template import PreprocessorConfiguration
+
+
+class IntegralIndex:
+    """ Cumulative integral (trapezoidal prefix sum) of fold signals.
+
+    Built once per fold, an integral of any range of any row (or of all the rows at once) is then two lookups and
+    a subtraction: range boundaries are found with binary search on the axis and the signal is linearly interpolated
+    between the axis points, so the result equals the trapezoidal integral of the signal cut at the exact boundaries.
+
+    Example:
+        indices = IntegralIndex.from_dataset(nested_dataset, instruction=DataFoldsConstants.spectro.nmr.config_y_of_x)
+        buckets = np.arange(0.5, 5.5, 0.04)
+        features = indices["fold0"].integrate(np.stack([buckets[:-1], buckets[1:]], axis=-1))
+    """
+    __slots__ = ("_y", "_x", "_cumulative", "_is_axis_shared")
+
+    def __init__(self, y: np.ndarray, x: np.ndarray = None):
+        """
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            x (np.ndarray): Monotonic x-axis, 1D shared by all the signals or 2D (n_samples, n_points) block.
+                Points indices are used if not passed.
+        """
+        y = np.atleast_2d(np.asarray(y, dtype=float))
+        x = np.arange(y.shape[-1], dtype=float) if x is None else np.asarray(x, dtype=float)
+        if x.ndim > 1 and (x == x[..., :1, :]).all():
+            # The same axis for all the signals
+            x = x[0]
+        if x.shape[-1] != y.shape[-1]:
+            raise ValueError(f"Axis length {x.shape[-1]} does not match the signal length {y.shape[-1]}.")
+        if np.ravel(x)[0] > np.ravel(x)[x.shape[-1] - 1]:
+            # Descending axis (eg. ppm, wavenumber), integrate from the lowest value
+            y, x = y[..., ::-1], x[..., ::-1]
+
+        self._y = np.ascontiguousarray(y)
+        self._x = np.ascontiguousarray(x)
+        self._is_axis_shared = x.ndim == 1
+        self._cumulative = np.zeros(y.shape)
+        np.cumsum((y[:, 1:] + y[:, :-1]) / 2 * np.diff(x, axis=-1), axis=-1, out=self._cumulative[:, 1:])
+
+    @classmethod
+    def from_dataset(
+            cls,
+            data: dict,
+            instruction: PreprocessorConfiguration = DataFoldsConstants.spectro.nmr.config_y_of_x
+    ) -> dict:
+        """ Builds index of every fold of the dataset.
+
+        Args:
+            data (dict): Dataset package in Preprocessor format.
+            instruction: Y_OF_X type configuration, defines signal and axis columns.
+
+        Returns:
+            (dict): Fold name and IntegralIndex pairs.
+        """
+        instruction_unpack, _ = instruction.get_instructions()
+        return {
+            fold_name: cls(
+                y=WrapperOperations.as_block(fold_data.get(instruction_unpack.get("y"))),
+                x=WrapperOperations.as_block(WrapperOperations.get_axis(fold_data, instruction_unpack.get("x")))
+            )
+            for fold_name, fold_data in data.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._y)
+
+    @property
+    def nbytes(self) -> int:
+        return self._y.nbytes + self._x.nbytes + self._cumulative.nbytes
+
+    def integrate(
+            self,
+            regions,
+            rows=None
+    ) -> np.ndarray:
+        """ Returns integrals of the passed regions.
+
+        Args:
+            regions: Single (start, end) region or a sequence of regions, in axis values. Boundaries outside the axis
+                are clipped to its range.
+            rows: Row index, slice or index array. All the rows by default.
+
+        Returns:
+            (np.ndarray): Integrals, (n_rows, n_regions) block, dimensions of single row or region are dropped.
+        """
+        regions = np.asarray(regions, dtype=float)
+        rows_index = np.arange(len(self))[rows if rows is not None else slice(None)]
+        values = np.sort(regions.reshape(-1, 2), axis=-1)
+        result = self._evaluate(values[:, 1], np.atleast_1d(rows_index)) \
+            - self._evaluate(values[:, 0], np.atleast_1d(rows_index))
+
+        if regions.ndim == 1:
+            result = result[:, 0]
+        return result[0] if np.ndim(rows_index) == 0 else result
+
+    def _evaluate(
+            self,
+            values: np.ndarray,
+            rows: np.ndarray
+    ) -> np.ndarray:
+        """ Returns cumulative integral of the rows at the passed axis values, (n_rows, n_values) block.
+        """
+        length = self._y.shape[-1]
+        if self._is_axis_shared:
+            values = np.clip(values, self._x[0], self._x[-1])
+            positions = np.clip(np.searchsorted(self._x, values, side="right") - 1, 0, length - 2)
+            positions = np.broadcast_to(positions, (len(rows), len(values)))
+            x_left = self._x[positions]
+            x_right = self._x[positions + 1]
+        else:
+            X = self._x[rows]
+            values = np.clip(values, X[:, :1], X[:, -1:])
+            # Binary search in all the rows at once, rows are shifted to be sorted one after another
+            shift = (X.max() - X.min() + 1) * np.arange(len(rows))[:, None]
+            positions = np.searchsorted((X + shift).ravel(), (values + shift).ravel(), side="right").reshape(
+                values.shape) - 1 - np.arange(len(rows))[:, None] * length
+            positions = np.clip(positions, 0, length - 2)
+            x_left = np.take_along_axis(X, positions, axis=-1)
+            x_right = np.take_along_axis(X, positions + 1, axis=-1)
+
+        rows = rows[:, None]
+        y_left = self._y[rows, positions]
+        y_right = self._y[rows, positions + 1]
+        # Trapezoid from the axis point on the left to the value, signal is linear between axis points
+        distance = values - x_left
+        with np.errstate(divide="ignore", invalid="ignore"):
+            y_value = y_left + np.nan_to_num((y_right - y_left) / (x_right - x_left)) * distance
+        return self._cumulative[rows, positions] + (y_left + y_value) / 2 * distance
@@ -0,0 +1,182 @@
+import numpy as np
+
+from src.processing.format.data_wrapper import data_interface
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+
+
+def _fit_reference(y: np.ndarray) -> np.ndarray:
+    """ MSC reference of the rows block, mean signal.
+    """
+    return np.mean(np.atleast_2d(y), axis=0)
+
+
+class Normalize:
+    """
+    A preprocessor class dedicated to signal normalization methods.
+
+    Every method works on 1D signals and 2D (n_samples, n_points) blocks along the last axis. Signals statistics are
+    calculated once per block, the result is written in a single pass into a new array, or into the passed one if
+    <inplace> is set and the array is writeable. With copy_on_write mode of data_interface, arrays shared with
+    the passed dataset are read-only, so a new array is used for them.
+    """
+
+    @staticmethod
+    def _get_output(
+            y: np.ndarray,
+            inplace: bool
+    ) -> np.ndarray:
+        """ Returns buffer for the method result: the passed array, if it can be overwritten, or a new one.
+        """
+        if inplace and isinstance(y, np.ndarray) and y.dtype.kind == "f" and y.flags.writeable:
+            return y
+        return np.empty(np.shape(y), dtype=float)
+
+    @staticmethod
+    def _get_scale(scale: np.ndarray) -> np.ndarray:
+        """ Returns scale of signals as column, constant (zero scale) signals are only shifted.
+        """
+        scale = np.where(scale == 0, 1.0, scale)
+        return scale[..., None]
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
+    def snv(
+            y: np.ndarray = None,
+            inplace: bool = False
+    ) -> np.ndarray:
+        """ Standard normal variate, every signal is centered and scaled to unit standard deviation.
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            inplace (bool): Overwrite the passed array.
+
+        Returns:
+            (np.ndarray): Normalized signals.
+        """
+        y = np.asarray(y, dtype=float)
+        output = Normalize._get_output(y, inplace)
+        mean = y.mean(axis=-1, keepdims=True)
+        scale = Normalize._get_scale(y.std(axis=-1))
+        np.subtract(y, mean, out=output)
+        return np.divide(output, scale, out=output)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
+    def min_max(
+            y: np.ndarray = None,
+            feature_range: (float, float) = (0, 1),
+            inplace: bool = False
+    ) -> np.ndarray:
+        """ Scales every signal to the passed range, as sklearn.preprocessing.minmax_scale(spectra.T).T does.
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            feature_range (float, float): Range of the scaled signal.
+            inplace (bool): Overwrite the passed array.
+
+        Returns:
+            (np.ndarray): Normalized signals.
+        """
+        y = np.asarray(y, dtype=float)
+        output = Normalize._get_output(y, inplace)
+        range_min, range_max = feature_range
+        if range_min >= range_max:
+            raise ValueError(f"Minimum of the range {feature_range} has to be smaller than its maximum.")
+
+        minimum = y.min(axis=-1, keepdims=True)
+        scale = Normalize._get_scale(y.max(axis=-1) - minimum[..., 0]) / (range_max - range_min)
+        np.subtract(y, minimum, out=output)
+        np.divide(output, scale, out=output)
+        return np.add(output, range_min, out=output)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
+    def area(
+            y: np.ndarray = None,
+            delta: float = 1.0,
+            x: np.ndarray = None,
+            inplace: bool = False
+    ) -> np.ndarray:
+        """ Scales every signal to the unit area under its absolute value (trapezoidal rule).
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            delta (float): The spacing of the samples, used if x-axis is not passed.
+            x (np.ndarray): X-axis, 1D shared by all the signals or 2D (n_samples, n_points) block, passed with
+                Y_OF_X instruction (eg. DataFoldsConstants.spectro.ftir.config_y_of_x).
+            inplace (bool): Overwrite the passed array.
+
+        Returns:
+            (np.ndarray): Normalized signals.
+        """
+        y = np.asarray(y, dtype=float)
+        output = Normalize._get_output(y, inplace)
+        if x is None:
+            area = np.trapz(np.abs(y), dx=delta, axis=-1)
+        else:
+            area = np.trapz(np.abs(y), x=np.asarray(x, dtype=float), axis=-1)
+        # Descending axes (eg. wavenumber) give negative areas
+        return np.divide(y, Normalize._get_scale(np.abs(area)), out=output)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True)
+    def vector_norm(
+            y: np.ndarray = None,
+            order: int = 2,
+            inplace: bool = False
+    ) -> np.ndarray:
+        """ Scales every signal to the unit vector norm.
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            order (int): Order of the norm, see numpy.linalg.norm (eg. 1, 2, np.inf).
+            inplace (bool): Overwrite the passed array.
+
+        Returns:
+            (np.ndarray): Normalized signals.
+        """
+        y = np.asarray(y, dtype=float)
+        output = Normalize._get_output(y, inplace)
+        if order == 2:
+            # Dot products of rows, without squared signals in memory
+            norm = np.sqrt(np.einsum("...i,...i->...", y, y))
+        else:
+            norm = np.linalg.norm(y, ord=order, axis=-1)
+        return np.divide(y, Normalize._get_scale(norm), out=output)
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.ftir.config_y, batch=True, fit={"reference": _fit_reference})
+    def msc(
+            y: np.ndarray = None,
+            reference: np.ndarray = None,
+            inplace: bool = False
+    ) -> np.ndarray:
+        """ Multiplicative scatter correction.
+        Every signal is fitted to the reference as y = a + b * reference and corrected to (y - a) / b.
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            reference (np.ndarray): Reference signal. If not passed, the mean signal of the block is used, so with
+                data_interface every fold is corrected to its own mean. Pass the reference (eg. mean of the train
+                fold) to correct all the folds the same way.
+            inplace (bool): Overwrite the passed array.
+
+        Returns:
+            (np.ndarray): Corrected signals.
+        """
+        y = np.asarray(y, dtype=float)
+        if reference is None:
+            if y.ndim < 2:
+                raise ValueError("Reference signal has to be passed to correct a single signal.")
+            reference = _fit_reference(y)
+        reference = np.asarray(reference, dtype=float)
+        if reference.shape[-1] != y.shape[-1]:
+            raise ValueError(f"Reference length {reference.shape[-1]} does not match the signal length {y.shape[-1]}.")
+        output = Normalize._get_output(y, inplace)
+
+        # Least squares fit of every signal to the centered reference
+        reference_centered = reference - reference.mean()
+        slope = (y @ reference_centered) / (reference_centered @ reference_centered)
+        intercept = y.mean(axis=-1) - slope * reference.mean()
+        np.subtract(y, intercept[..., None], out=output)
+        return np.divide(output, Normalize._get_scale(slope), out=output)
@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+
+from scipy.signal import find_peaks, peak_prominences, peak_widths
+
+from src.processing.format.data_wrapper import data_interface
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+
+
+class Peaks:
+    """
+    A preprocessor class dedicated to peak detection and quantification methods.
+
+    Methods work on whole (n_samples, n_points) blocks with their x-axis (eg. chemical shift or wavenumber) and store
+    per-sample results as rows of features (see <_FEATURES_DETECT> and <_FEATURES_QUANTIFY>), in a separate fold column
+    (DataFoldsConstants.spectro.nmr.config_peaks). Use to_table to get a single table of all the folds.
+    """
+    _FEATURES_DETECT = [
+        "position",
+        "height",
+        "prominence",
+        "width",
+        "area",
+    ]
+    _FEATURES_QUANTIFY = [
+        "position",
+        "height",
+        "area",
+    ]
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.nmr.config_peaks, batch=True)
+    def detect(
+            y: np.ndarray = None,
+            x: np.ndarray = None,
+            height: float = None,
+            prominence: float = None,
+            width: float = None,
+            rel_height: float = 0.5,
+            region: (float, float) = None
+    ) -> list:
+        """ Finds peaks of all the signals of the block at once.
+
+        Rows of the block are joined into a single array separated by +inf points (which work as signal borders for
+        prominence and width search), so peaks of the whole block are found with single calls of scipy.signal
+        find_peaks, peak_prominences and peak_widths (the same steps as find_peaks does).
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            x (np.ndarray): X-axis, 1D shared by all the signals or 2D (n_samples, n_points) block. Positions and
+                widths are returned in axis units, points indices are used if not passed.
+            height (float): Minimal peak height.
+            prominence (float): Minimal peak prominence.
+            width (float): Minimal peak width, in points.
+            rel_height (float): Relative height at which the peak width is measured, see scipy.signal.peak_widths.
+            region (float, float): Return only peaks positioned in the region (axis values).
+
+        Returns:
+            (list): Per-signal (n_peaks, 5) arrays of features: position, height, prominence, width and area above
+                the line at which the width is measured, or a single array for 1D signal.
+        """
+        y = np.asarray(y, dtype=float)
+        Y = np.atleast_2d(y)
+        samples, length = Y.shape
+        X = Peaks._get_axis_block(x, Y.shape)
+
+        flat = np.concatenate([Y, np.full((samples, 1), np.inf)], axis=-1).ravel()
+        peaks, properties = find_peaks(flat, height=(height, None))
+        # Separators are peaks as well, they are removed before prominence search (it would not be bounded)
+        is_signal = peaks % (length + 1) < length
+        peaks, peak_heights = peaks[is_signal], properties.get("peak_heights")[is_signal]
+
+        prominences, left_bases, right_bases = peak_prominences(flat, peaks)
+        is_prominent = prominences >= (prominence if prominence is not None else 0)
+        peaks, peak_heights = peaks[is_prominent], peak_heights[is_prominent]
+        prominence_data = (prominences[is_prominent], left_bases[is_prominent], right_bases[is_prominent])
+        widths, width_heights, left, right = peak_widths(
+            flat, peaks, rel_height=rel_height, prominence_data=prominence_data)
+        is_wide = widths >= (width if width is not None else 0)
+        peaks, width_heights, left, right = peaks[is_wide], width_heights[is_wide], left[is_wide], right[is_wide]
+        rows, columns = np.divmod(peaks, length + 1)
+
+        # Width crossing points, as fractional indices of the row
+        left, right = left - rows * (length + 1), right - rows * (length + 1)
+        cumulative = Peaks._get_cumulative_integral(Y, X)
+        x_left, x_right = Peaks._interpolate(X, rows, left), Peaks._interpolate(X, rows, right)
+        area = Peaks._interpolate(cumulative, rows, right) - Peaks._interpolate(cumulative, rows, left)
+
+        features = np.stack([
+            X[rows, columns],
+            peak_heights[is_wide],
+            prominence_data[0][is_wide],
+            np.abs(x_right - x_left),
+            np.abs(area - width_heights * (x_right - x_left)),
+        ], axis=-1)
+
+        if region is not None:
+            is_in_region = (features[:, 0] >= min(region)) & (features[:, 0] <= max(region))
+            features, rows = features[is_in_region], rows[is_in_region]
+        result = np.split(features, np.searchsorted(rows, np.arange(1, samples)))
+        return result if y.ndim > 1 else result[0]
+
+    @staticmethod
+    @data_interface(instruction=DataFoldsConstants.spectro.nmr.config_peaks, batch=True)
+    def quantify(
+            y: np.ndarray = None,
+            x: np.ndarray = None,
+            regions: list = ((3.1, 3.25), (3.25, 3.7)),
+            baseline: bool = True
+    ) -> np.ndarray:
+        """ Integrates peaks in the passed regions of all the signals of the block.
+
+        Cumulative integral of the block is calculated once, every region integral is a difference of two of its
+        points. Region boundaries are resolved to the closest axis points of every signal.
+
+        Args:
+            y (np.ndarray): Signal array, 1D signal or 2D (n_samples, n_points) block.
+            x (np.ndarray): Monotonic x-axis, 1D shared by all the signals or 2D (n_samples, n_points) block.
+            regions (list): Sequence of (start, end) regions in axis values (eg. ppm).
+            baseline (bool): Subtract linear baseline drawn between the region boundaries.
+
+        Returns:
+            (np.ndarray): (n_samples, n_regions, 3) block of features: position of the maximum, its height and area
+                (trapezoidal rule), or (n_regions, 3) for 1D signal.
+        """
+        y = np.asarray(y, dtype=float)
+        Y = np.atleast_2d(y)
+        X = Peaks._get_axis_block(x, Y.shape)
+        if X[0, 0] > X[0, -1]:
+            # Descending axis (eg. ppm, wavenumber), integrate from the lowest value
+            Y, X = Y[..., ::-1], X[..., ::-1]
+        samples, length = Y.shape
+        rows = np.arange(samples)[:, None]
+
+        # Closest points of region boundaries, searched in all the rows at once (rows are shifted to be sorted)
+        shift = (X.max() - X.min() + 1) * np.arange(samples)
+        values = np.sort(np.asarray(regions, dtype=float), axis=-1)
+        boundaries = np.searchsorted((X + shift[:, None]).ravel(), values.ravel() + shift[:, None]) - rows * length
+        boundaries = np.clip(boundaries, 1, length - 1)
+        boundaries -= (values.ravel() - X[rows, boundaries - 1]) < (X[rows, boundaries] - values.ravel())
+        left, right = boundaries[:, 0::2], boundaries[:, 1::2]
+
+        cumulative = Peaks._get_cumulative_integral(Y, X)
+        area = cumulative[rows, right] - cumulative[rows, left]
+        chord_slope = np.zeros(left.shape)
+        if baseline:
+            width = X[rows, right] - X[rows, left]
+            area -= (Y[rows, left] + Y[rows, right]) / 2 * width
+            with np.errstate(divide="ignore", invalid="ignore"):
+                chord_slope = np.nan_to_num((Y[rows, right] - Y[rows, left]) / width)
+
+        features = np.empty(left.shape + (len(Peaks._FEATURES_QUANTIFY),))
+        features[..., 2] = area
+        for idx in range(left.shape[1]):
+            # Points of the region, shorter regions of the block are padded with their last point
+            span = np.minimum(left[:, idx:idx + 1] + np.arange((right[:, idx] - left[:, idx]).max() + 1),
+                              right[:, idx:idx + 1])
+            Y_region = np.take_along_axis(Y, span, axis=-1)
+            X_region = np.take_along_axis(X, span, axis=-1)
+            if baseline:
+                x_left = X[rows[:, 0], left[:, idx]][:, None]
+                Y_region = Y_region - (Y[rows[:, 0], left[:, idx]][:, None]
+                                       + chord_slope[:, idx:idx + 1] * (X_region - x_left))
+            maximum = np.argmax(Y_region, axis=-1)
+            features[:, idx, 0] = X_region[rows[:, 0], maximum]
+            features[:, idx, 1] = Y_region[rows[:, 0], maximum]
+        return features if y.ndim > 1 else features[0]
+
+    @staticmethod
+    def to_table(
+            data: dict,
+            label: str = DataFoldsConstants.spectro.nmr.constants.Y_PEAKS,
+            region_names: list = None
+    ) -> pd.DataFrame:
+        """ Collects peak features of all the folds into a single long-format table.
+
+        Args:
+            data (dict): Dataset package processed with detect or quantify.
+            label (str): Column of peak features.
+            region_names (list): Names of quantified regions, region indices are used if not passed.
+
+        Returns:
+            (pd.DataFrame): Row per peak: fold, sample, peak (index or region name) and features.
+        """
+        tables = []
+        for fold_name, fold_data in data.items():
+            rows = list(fold_data[label])
+            counts = [len(row) for row in rows]
+            if not sum(counts):
+                continue
+            features = np.concatenate([np.asarray(row).reshape(len(row), -1) for row in rows])
+            columns = Peaks._FEATURES_DETECT if features.shape[1] == len(Peaks._FEATURES_DETECT) \
+                else Peaks._FEATURES_QUANTIFY
+            table = pd.DataFrame(features, columns=columns)
+            peaks = np.concatenate([np.arange(count) for count in counts])
+            table.insert(0, "peak", np.asarray(region_names)[peaks] if region_names is not None else peaks)
+            table.insert(0, "sample", np.repeat(np.arange(len(rows)), counts))
+            table.insert(0, "fold", fold_name)
+            tables.append(table)
+        return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+    @staticmethod
+    def _get_axis_block(
+            x: np.ndarray,
+            shape: tuple
+    ) -> np.ndarray:
+        """ Returns x-axis as a (n_samples, n_points) block (broadcast view if shared), points indices if not passed.
+        """
+        if x is None:
+            x = np.arange(shape[-1], dtype=float)
+        return np.broadcast_to(np.asarray(x, dtype=float), shape)
+
+    @staticmethod
+    def _get_cumulative_integral(
+            Y: np.ndarray,
+            X: np.ndarray
+    ) -> np.ndarray:
+        """ Returns cumulative trapezoidal integral of every signal, starting from 0 at the first point.
+        """
+        cumulative = np.zeros(Y.shape)
+        np.cumsum((Y[:, 1:] + Y[:, :-1]) / 2 * np.diff(X, axis=-1), axis=-1, out=cumulative[:, 1:])
+        return cumulative
+
+    @staticmethod
+    def _interpolate(
+            block: np.ndarray,
+            rows: np.ndarray,
+            positions: np.ndarray
+    ) -> np.ndarray:
+        """ Returns values of the block rows at fractional positions (linear interpolation).
+        """
+        left = np.clip(np.floor(positions).astype(np.int64), 0, block.shape[-1] - 2)
+        fraction = positions - left
+        return block[rows, left] * (1 - fraction) + block[rows, left + 1] * fraction
@@ -1,9 +1,17 @@
+from typing import Type
+
 
 from src.processing.format.data_wrapper_constants import DataFoldsConstants
+from src.processing.format.data_wrapper_cache import ResultsCache
+from src.processing.format.data_wrapper_executor import ExecutorSettings
+from src.processing.format.data_wrapper_pipeline import Pipeline
 
 from src.processing.methods.filter import Filter
 from src.processing.methods.baseline import Baseline
 from src.processing.methods.dimmensions import Dimensions
+from src.processing.methods.normalize import Normalize
+from src.processing.methods.peaks import Peaks
+from src.processing.methods.integral_index import IntegralIndex
 
 
 class Preprocessor:
@@ -13,3 +21,28 @@ class Preprocessor:
     filter: Filter = Filter()
     baseline: Baseline = Baseline()
     dimensions: Dimensions = Dimensions()
+    normalize: Normalize = Normalize()
+    peaks: Peaks = Peaks()
+    pipeline: Type[Pipeline] = Pipeline
+    integral_index: Type[IntegralIndex] = IntegralIndex
+
+    @staticmethod
+    def set_execution(workers: int = None, executor: str = ExecutorSettings.EXECUTOR_PROCESS) -> None:
+        """ Sets default execution backend of all data_interface methods.
+
+        Args:
+            workers (int): Number of workers, None or 1 runs serial loop.
+            executor (str): "process" or "thread" pool.
+        """
+        ExecutorSettings.set(workers=workers, executor=executor)
+
+    @staticmethod
+    def set_cache(enabled: bool = True, max_bytes: int = 512 * 1024 ** 2, disk: bool = False) -> None:
+        """ Sets default results cache mode of all data_interface methods.
+
+        Args:
+            enabled (bool): Reuse results of methods called with the same settings on the same data.
+            max_bytes (int): Memory tier limit in bytes.
+            disk (bool): Store results in data/cache directory as well.
+        """
+        ResultsCache.set(enabled=enabled, max_bytes=max_bytes, disk=disk)
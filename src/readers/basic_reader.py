@@ -1,6 +1,8 @@
 
 import os.path
+import shutil
 
+import numpy as np
 import pandas as pd
 import json
 
@@ -270,6 +272,81 @@ class BasicReader:
             else:
                 raise ValueError("Passed format is not supported.")
 
+    @staticmethod
+    def data_stream_npy(files: dict, chunk_rows: int = 1024):
+        """ Yields row chunks of a dataset stored as .npy files (one file per column), for datasets larger than RAM.
+
+        Files are memory-mapped, only the rows of the current chunk are read from disk. Chunks can be passed on
+        processing methods with the <stream> key.
+
+        Args:
+            files (dict): Column name and .npy file path pairs, eg. {"spectra": "spectra.npy"}.
+            chunk_rows (int): Number of rows in the chunk.
+
+        Yields:
+            (dict): Chunk in Preprocessor fold format {column_name: rows}.
+        """
+        columns = {label: np.load(file_path, mmap_mode="r") for label, file_path in files.items()}
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"Passed files have different number of rows: {lengths}")
+        for idx in range(0, lengths.pop(), chunk_rows):
+            yield {label: column[idx:idx + chunk_rows] for label, column in columns.items()}
+
+    @staticmethod
+    def data_stream_save_npy(chunks, files: dict) -> int:
+        """ Writes processed chunks into .npy files (one file per column) without collecting them in memory.
+
+        Args:
+            chunks: Iterable of chunks, eg. generator returned by a processing method called with <stream> key.
+            files (dict): Column name and .npy file path pairs, only these columns are saved.
+
+        Returns:
+            (int): Number of saved rows.
+        """
+        if not files:
+            raise ValueError("At least one column has to be saved.")
+        raw_files = {label: open(f"{file_path}.raw", "wb") for label, file_path in files.items()}
+        row_formats = {}
+        rows = dict.fromkeys(files, 0)
+        try:
+            for chunk in chunks:
+                for label, raw_file in raw_files.items():
+                    column = chunk[label]
+                    block = np.ascontiguousarray(column if isinstance(column, np.ndarray) else list(column))
+                    row_format = row_formats.setdefault(label, (block.dtype, block.shape[1:]))
+                    if (block.dtype, block.shape[1:]) != row_format:
+                        raise ValueError(
+                            f"Rows of column <{label}> changed format from {row_format} to "
+                            f"{(block.dtype, block.shape[1:])}.")
+                    raw_file.write(block.tobytes())
+                    rows[label] += len(block)
+                if len(set(rows.values())) > 1:
+                    raise ValueError(f"Saved columns have different number of rows: {rows}.")
+        except BaseException:
+            # Partially written data is removed
+            for raw_file in raw_files.values():
+                raw_file.close()
+                os.remove(raw_file.name)
+            raise
+        finally:
+            for raw_file in raw_files.values():
+                raw_file.close()
+
+        # Number of rows is known at the end, prepend .npy header to the raw data
+        for label, file_path in files.items():
+            dtype, row_shape = row_formats.get(label, (np.dtype(np.float64), ()))
+            header = {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (rows.get(label),) + row_shape
+            }
+            with open(file_path, "wb") as saved_file, open(f"{file_path}.raw", "rb") as raw_file:
+                np.lib.format.write_array_header_1_0(saved_file, header)
+                shutil.copyfileobj(raw_file, saved_file)
+            os.remove(f"{file_path}.raw")
+        return next(iter(rows.values()))
+
     """ Static methods/partials
     """
 
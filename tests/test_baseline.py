@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+from src.processing.processing_methods import Preprocessor
+
+
+def _get_signals(rows: int = 6, length: int = 500) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    points = np.linspace(0, 1, length)
+    peaks = sum(np.exp(-((points - center) / 0.01) ** 2) * rng.uniform(1, 3, size=(rows, 1))
+                for center in (0.2, 0.45, 0.7))
+    baseline = rng.uniform(0, 2, size=(rows, 1)) * points + rng.uniform(0, 1, size=(rows, 1)) * points ** 2
+    return peaks + baseline + rng.normal(0, 0.01, size=(rows, length))
+
+
+def _als_reference(y: np.ndarray, lam: float, p: float, iterations: int) -> np.ndarray:
+    # Sparse ALS of Eilers and Boelens, one signal at a time
+    length = len(y)
+    difference_matrix = sparse.diags([1, -2, 1], [0, -1, -2], shape=(length, length - 2))
+    penalty = lam * difference_matrix.dot(difference_matrix.transpose())
+    weights = np.ones(length)
+    for _ in range(iterations):
+        baseline = spsolve(sparse.csc_matrix(sparse.diags(weights) + penalty), weights * y)
+        weights = p * (y > baseline) + (1 - p) * (y < baseline)
+    return baseline
+
+
+def _imodpoly_reference(y: np.ndarray, degree: int, iterations: int, gradient: float) -> np.ndarray:
+    # BaselineRemoval.IModPoly, returns the signal with removed polynomial
+    basis = np.vander(np.linspace(-1, 1, len(y)), degree + 1, increasing=True)
+    prediction = basis @ np.linalg.lstsq(basis, y, rcond=None)[0]
+    deviation_previous = np.std(y - prediction)
+    mask = y <= prediction + deviation_previous
+    y_work, basis_work = y[mask], basis[mask]
+    for i in range(2, iterations + 1):
+        if i > 2:
+            deviation_previous = deviation
+        coefficients = np.linalg.lstsq(basis_work, y_work, rcond=None)[0]
+        prediction = basis_work @ coefficients
+        deviation = np.std(y_work - prediction)
+        if np.abs((deviation - deviation_previous) / deviation) < gradient:
+            break
+        y_work = np.minimum(y_work, prediction + deviation)
+    return y - basis @ coefficients
+
+
+@pytest.mark.parametrize("lam, p, iterations", [(10**3, 0.1, 10), (10**5, 0.01, 20), (10**7, 0.05, 1)])
+def test_als_optimized_same_as_spsolve(lam, p, iterations):
+    Y = _get_signals()
+    expected = np.stack([_als_reference(y, lam, p, iterations) for y in Y])
+
+    result = Preprocessor.baseline.als_optimized(y=Y, output="baseline", lam=lam, p=p, iterations=iterations)
+    result_row = Preprocessor.baseline.als_optimized(y=Y[0], output="baseline", lam=lam, p=p, iterations=iterations)
+
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-8)
+    np.testing.assert_allclose(result_row, expected[0], rtol=0, atol=1e-8)
+
+
+def test_als_optimized_zero_tolerance_same_as_all_iterations():
+    Y = _get_signals()
+
+    expected = Preprocessor.baseline.als_optimized(y=Y, output="baseline", lam=10**5, p=0.01, iterations=30)
+    result, counts = Preprocessor.baseline.als_optimized(
+        y=Y, output="baseline", lam=10**5, p=0.01, iterations=30, tolerance=0, return_iterations=True)
+
+    np.testing.assert_array_equal(result, expected)
+    assert (counts <= 30).all()
+
+
+@pytest.mark.parametrize("degree, iterations, gradient", [(2, 100, 0.001), (4, 100, 0.0001), (3, 3, 0.001)])
+def test_improved_mod_poly_same_as_reference(degree, iterations, gradient):
+    Y = _get_signals()
+    expected = np.stack([_imodpoly_reference(y, degree, iterations, gradient) for y in Y])
+
+    result = Preprocessor.baseline.improved_mod_poly(
+        y=Y, output="baseline", polynomial_degree=degree, iterations=iterations, gradient=gradient)
+    result_row = Preprocessor.baseline.improved_mod_poly(
+        y=Y[0], output="baseline", polynomial_degree=degree, iterations=iterations, gradient=gradient)
+
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(result_row, expected[0], rtol=0, atol=1e-10)
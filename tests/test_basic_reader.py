@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.readers.basic_reader import BasicReader
+
+
+def test_data_stream_save_npy_round_trip(tmp_path):
+    Y = np.arange(60.0).reshape(20, 3)
+    target = np.arange(20)
+    files = {"spectra": str(tmp_path / "spectra.npy"), "target": str(tmp_path / "target.npy")}
+    chunks = ({"spectra": Y[idx:idx + 6], "target": target[idx:idx + 6]} for idx in range(0, 20, 6))
+
+    rows = BasicReader.data_stream_save_npy(chunks, files)
+
+    assert rows == 20
+    np.testing.assert_array_equal(np.load(files["spectra"]), Y)
+    np.testing.assert_array_equal(np.load(files["target"]), target)
+    chunks = list(BasicReader.data_stream_npy(files, chunk_rows=8))
+    np.testing.assert_array_equal(np.concatenate([chunk["spectra"] for chunk in chunks]), Y)
+
+
+def test_data_stream_save_npy_different_rows(tmp_path):
+    files = {"spectra": str(tmp_path / "spectra.npy"), "target": str(tmp_path / "target.npy")}
+    chunks = [{"spectra": np.ones((4, 3)), "target": np.ones(3)}]
+
+    with pytest.raises(ValueError):
+        BasicReader.data_stream_save_npy(chunks, files)
+    with pytest.raises(ValueError):
+        BasicReader.data_stream_save_npy(chunks, {})
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from src.processing.format.data_wrapper_block import SpectraBlock
+
+
+def test_ragged_block_round_trip():
+    rows = [np.arange(5.0), np.arange(6.0)]
+    frame = pd.DataFrame({"Sample no": [1, 2], "spectra": rows})
+
+    block = SpectraBlock.from_frame(frame)
+    result = block.to_frame()
+
+    assert list(result.columns) == ["Sample no", "spectra"]
+    assert list(result["Sample no"]) == [1, 2]
+    for row, expected in zip(result["spectra"], rows):
+        np.testing.assert_array_equal(row, expected)
+
+
+def test_ragged_block_nbytes():
+    rows = [np.arange(5.0), np.arange(6.0)]
+    block = SpectraBlock({"spectra": rows})
+
+    assert block.nbytes == sum(row.nbytes for row in rows)
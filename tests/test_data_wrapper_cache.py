@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.processing.format.data_wrapper_cache import ResultsCache, get_value_digest
+from src.processing.format.data_wrapper_constants import DataFoldsConstants
+
+
+def _scale(y: np.ndarray = None):
+    return y * 2.0
+
+
+def _get_key(function) -> str:
+    return ResultsCache.key(
+        function, DataFoldsConstants.spectro.ftir.config_y, {"spectra": np.ones((2, 5))}, {})
+
+
+def test_key_changes_with_method_literal():
+    key = _get_key(_scale)
+    code = _scale.__code__
+    try:
+        # The same bytecode, only the constant differs
+        _scale.__code__ = code.replace(co_consts=tuple(3.0 if const == 2.0 else const for const in code.co_consts))
+        assert _scale.__code__.co_code == code.co_code
+        assert _get_key(_scale) != key
+    finally:
+        _scale.__code__ = code
+    assert _get_key(_scale) == key
+
+
+def test_value_digest_of_large_arrays():
+    reference = np.zeros(2000)
+    reference_changed = reference.copy()
+    reference_changed[1000] = 1.0
+
+    # Repr of both arrays is the same, it is shortened above 1000 elements
+    assert repr(reference) == repr(reference_changed)
+    assert get_value_digest({"reference": reference}) != get_value_digest({"reference": reference_changed})
+    assert get_value_digest({"reference": reference, "inplace": False}) == get_value_digest(
+        {"inplace": False, "reference": reference.copy()})
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from src.processing.format.data_wrapper_pipeline import Pipeline
+from src.processing.processing_methods import Preprocessor
+
+
+def _get_data() -> dict:
+    rng = np.random.default_rng(0)
+    return {
+        "fold0": {"spectra": rng.normal(size=(40, 50)) + np.linspace(0, 5, 40)[:, None]},
+        "fold1": {"spectra": rng.normal(size=(7, 50))},
+    }
+
+
+def test_msc_workers_fit_reference_on_whole_fold():
+    data = _get_data()
+
+    expected = Preprocessor.normalize.msc(data=data)
+    result = Preprocessor.normalize.msc(data=data, workers=2, executor="thread")
+    result_pipeline = Pipeline([Preprocessor.normalize.snv, Preprocessor.normalize.msc])(
+        data=data, workers=2, executor="thread")
+
+    for fold_name in data:
+        np.testing.assert_allclose(result[fold_name]["spectra"], expected[fold_name]["spectra"], atol=1e-12)
+        np.testing.assert_allclose(
+            result_pipeline[fold_name]["spectra"],
+            Preprocessor.normalize.msc(data=Preprocessor.normalize.snv(data=data))[fold_name]["spectra"])
+
+
+def test_msc_stream_requires_reference():
+    data = _get_data()
+
+    with pytest.raises(ValueError):
+        Preprocessor.normalize.msc(data=iter(data.values()), stream=True)
+    with pytest.raises(ValueError):
+        Preprocessor.baseline.als_optimized(data=iter(data.values()), stream=True, warm_start="median")
+
+    reference = np.mean(data["fold0"]["spectra"], axis=0)
+    result = list(Preprocessor.normalize.msc(data=iter(data.values()), stream=True, reference=reference))
+    np.testing.assert_array_equal(
+        result[0]["spectra"], Preprocessor.normalize.msc(data=data, reference=reference)["fold0"]["spectra"])
+
+
+_BATCH_METHODS = [
+    (Preprocessor.filter.fourier, {}),
+    (Preprocessor.filter.running_median_insort, {"window_size": 5}),
+    (Preprocessor.filter.sav_gol, {"window_size": 15, "polyorder": 3}),
+    (Preprocessor.baseline.als_optimized, {"lam": 10**4}),
+    (Preprocessor.baseline.als_optimized, {"lam": 10**4, "iterations": 2, "warm_start": "median"}),
+    (Preprocessor.baseline.als_optimized, {"lam": 10**4, "iterations": 2, "warm_start": "previous"}),
+    (Preprocessor.baseline.als_segmented, {"segment_size": 200, "overlap": 40}),
+    (Preprocessor.baseline.improved_mod_poly, {}),
+    (Preprocessor.baseline.running_median_insort, {"window_size": 5}),
+    (Preprocessor.dimensions.cut_in_range, {"cut_range": (50, -50)}),
+    (Preprocessor.dimensions.cut_regions, {"regions": ((100, 200), (300, 400))}),
+    (Preprocessor.dimensions.resample, {"axis_target": np.linspace(3900, 700, 300)}),
+    (Preprocessor.normalize.area, {}),
+    (Preprocessor.normalize.min_max, {}),
+    (Preprocessor.normalize.msc, {}),
+    (Preprocessor.normalize.snv, {}),
+    (Preprocessor.normalize.vector_norm, {}),
+    (Preprocessor.peaks.detect, {"prominence": 0.5}),
+    (Preprocessor.peaks.quantify, {"regions": ((3.0, 4.0), (5.0, 6.5))}),
+]
+
+
+def _get_signal_data() -> dict:
+    rng = np.random.default_rng(0)
+    data = {}
+    for fold_name, rows in (("fold0", 40), ("fold1", 7)):
+        points = np.arange(600)
+        Y = (np.exp(-((points - 300) / 20.0) ** 2) * rng.uniform(1, 5, size=(rows, 1))
+             + np.linspace(0, 2, 600) * rng.uniform(0, 1, size=(rows, 1)) + rng.normal(0, 0.01, size=(rows, 600)))
+        data.update({fold_name: {
+            "spectra": Y,
+            "heat_flow": Y,
+            "axis_wavenumber": np.tile(np.linspace(4000, 600, 600), (rows, 1)),
+            "axis_chem_shift": np.tile(np.linspace(0, 10, 600), (rows, 1)),
+        }})
+    return data
+
+
+def test_batch_methods_listed():
+    listed = {function.__qualname__ for function, _ in _BATCH_METHODS}
+    methods = {
+        function.__qualname__
+        for group in (Preprocessor.filter, Preprocessor.baseline, Preprocessor.dimensions, Preprocessor.normalize,
+                      Preprocessor.peaks)
+        for function in vars(type(group)).values()
+        if getattr(getattr(function, "__func__", function), "batch", False)
+    }
+
+    assert listed == methods
+
+
+@pytest.mark.parametrize("function, kwargs", _BATCH_METHODS)
+def test_batch_methods_workers_same_as_serial(function, kwargs):
+    data = _get_signal_data()
+
+    expected = function(data=data, **kwargs)
+    result = function(data=data, workers=2, executor="thread", **kwargs)
+
+    for fold_name, fold_data in expected.items():
+        for label, column in fold_data.items():
+            np.testing.assert_allclose(result[fold_name][label], column, rtol=1e-10, atol=1e-10)
+
+
+def test_detect_workers_ragged_peaks():
+    data = _get_signal_data()
+    # Rows with one and two peaks
+    data["fold0"]["spectra"][::2] += np.exp(-((np.arange(600) - 100) / 5.0) ** 2) * 3
+
+    expected = Preprocessor.peaks.detect(data=data, prominence=0.5)
+    result = Preprocessor.peaks.detect(data=data, prominence=0.5, workers=2, executor="thread")
+
+    assert [len(peaks) for peaks in result["fold0"]["peaks"]] == [2, 1] * 20
+    for fold_name, fold_data in expected.items():
+        for peaks, peaks_expected in zip(result[fold_name]["peaks"], fold_data["peaks"]):
+            np.testing.assert_allclose(peaks, peaks_expected, rtol=1e-10)
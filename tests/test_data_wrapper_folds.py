@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.processing.format.data_wrapper_block import SpectraBlock
+from src.processing.format.data_wrapper_pipeline import Pipeline
+from src.processing.processing_methods import Preprocessor
+
+
+def _get_folds(Y: np.ndarray) -> list:
+    return [
+        {"spectra": Y},
+        {"spectra": list(Y)},
+        SpectraBlock({"spectra": Y}),
+        pd.DataFrame({"spectra": list(Y)}),
+        # Rows of different lengths are processed row by row
+        pd.DataFrame({"spectra": [Y[0], Y[1], Y[2, :40], Y[3, :45]]}),
+        {"spectra": [Y[0], Y[1], Y[2, :40], Y[3, :45]]},
+        SpectraBlock({"spectra": [Y[0], Y[1], Y[2, :40], Y[3, :45]]}),
+    ]
+
+
+@pytest.mark.parametrize("fold_idx", range(7))
+@pytest.mark.parametrize("method", ["snv", "min_max", "vector_norm"])
+def test_copy_on_write_inplace_keeps_passed_data(fold_idx, method):
+    Y = np.random.default_rng(0).normal(size=(4, 50))
+    Y_passed = Y.copy()
+    data = {"fold0": _get_folds(Y)[fold_idx]}
+    function = getattr(Preprocessor.normalize, method)
+
+    result = function(data=data, inplace=True, copy_on_write=True)
+    Pipeline([(function, {"inplace": True})])(data=data, copy_on_write=True)
+    list(function(data=iter(data.values()), inplace=True, stream=True))
+
+    np.testing.assert_array_equal(Y, Y_passed)
+    expected = function(y=Y_passed[0])
+    np.testing.assert_allclose(np.asarray(list(result["fold0"]["spectra"])[0]), expected)
+
+
+def test_copy_on_write_inplace_after_cut_keeps_passed_data():
+    Y = np.random.default_rng(0).normal(size=(4, 50))
+    Y_passed = Y.copy()
+    instruction = Preprocessor.CONST.spectro.ftir.config_y
+    pipeline = Pipeline([
+        (Preprocessor.dimensions.cut_in_range, {"cut_range": (5, -5), "instruction": instruction}),
+        (Preprocessor.normalize.snv, {"inplace": True}),
+    ])
+
+    pipeline(data={"fold0": {"spectra": Y}}, copy_on_write=True)
+    Preprocessor.normalize.snv(
+        data=Preprocessor.dimensions.cut_in_range(
+            data={"fold0": {"spectra": Y}}, cut_range=(5, -5), instruction=instruction, copy_on_write=True),
+        inplace=True, copy_on_write=True)
+
+    np.testing.assert_array_equal(Y, Y_passed)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.processing.processing_methods import Preprocessor
+
+
+def test_multiple_yx_pack_single_signal_dict_fold():
+    axis = np.linspace(4000, 600, 300)
+    data = {"fold0": {"spectra": np.arange(300.0), "axis_wavenumber": axis}}
+
+    result = Preprocessor.dimensions.cut_in_range(data=data, cut_range=(10, -10))
+
+    assert result["fold0"]["spectra"].shape == (280,)
+    assert result["fold0"]["axis_wavenumber"].shape == (280,)
+    np.testing.assert_array_equal(result["fold0"]["spectra"], np.arange(10.0, 290.0))
+    np.testing.assert_array_equal(result["fold0"]["axis_wavenumber"], axis[10:290])
+
+
+def test_multiple_yx_pack_block_dict_fold():
+    axis = np.linspace(4000, 600, 300)
+    data = {"fold0": {"spectra": np.ones((3, 300)), "axis_wavenumber": np.tile(axis, (3, 1))}}
+
+    result = Preprocessor.dimensions.cut_in_range(data=data, cut_range=(10, -10))
+
+    assert result["fold0"]["spectra"].shape == (3, 280)
+    assert result["fold0"]["axis_wavenumber"].shape == (3, 280)
+
+
+def test_cut_regions_requires_regions():
+    axis = np.linspace(4000, 600, 235)
+    data = {"fold0": {"spectra": np.ones((3, 235)), "axis_wavenumber": np.tile(axis, (3, 1))}}
+
+    with pytest.raises(ValueError):
+        Preprocessor.dimensions.cut_regions(data=data)
+    result = Preprocessor.dimensions.cut_regions(data=data, regions=((10, 20), (100, 150)))
+
+    assert result["fold0"]["spectra"].shape == (3, 60)
+    np.testing.assert_array_equal(result["fold0"]["axis_wavenumber"][0], np.r_[axis[10:20], axis[100:150]])
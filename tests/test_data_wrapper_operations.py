@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.processing.format.data_wrapper_operations import WrapperOperations
+
+
+def test_collect_rows_keeps_none_rows():
+    rows = [None, np.ones(3), None]
+
+    result = WrapperOperations.collect_rows(iter(rows), len(rows))
+
+    assert len(result) == 3
+    assert result[0] is None and result[2] is None
+    np.testing.assert_array_equal(result[1], np.ones(3))
+
+
+def test_collect_rows_empty():
+    assert WrapperOperations.collect_rows(iter([]), 0) == []
+
+
+def test_collect_rows_block():
+    rows = [np.full(3, idx, dtype=float) for idx in range(4)]
+
+    result = WrapperOperations.collect_rows(iter(rows), len(rows))
+
+    assert isinstance(result, np.ndarray)
+    np.testing.assert_array_equal(result, np.stack(rows))
@@ -0,0 +1,63 @@
+from math import factorial
+
+import numpy as np
+import pytest
+
+from scipy.signal import savgol_filter
+
+from src.processing.processing_methods import Preprocessor
+
+
+def _get_signals(rows: int = 4, length: int = 300) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    points = np.linspace(0, 1, length)
+    return (np.sin(2 * np.pi * 3 * points) * rng.uniform(1, 2, size=(rows, 1))
+            + np.exp(-((points - 0.5) / 0.05) ** 2) + rng.normal(0, 0.05, size=(rows, length)))
+
+
+def _savgol_reference(y: np.ndarray, x: np.ndarray, window_size: int, polyorder: int, derivative: int) -> np.ndarray:
+    # Polynomial fitted to the window around every point, edge windows shifted inside the signal
+    half = window_size // 2
+    result = np.empty(len(y))
+    for idx in range(len(y)):
+        start = min(max(idx - half, 0), len(y) - window_size)
+        window = slice(start, start + window_size)
+        coefficients = np.polynomial.polynomial.polyfit(x[window] - x[idx], y[window], polyorder)
+        result[idx] = coefficients[derivative] * factorial(derivative) if derivative <= polyorder else 0.
+    return result
+
+
+@pytest.mark.parametrize("window_size, polyorder", [(5, 2), (15, 3), (31, 5), (4, 2)])
+@pytest.mark.parametrize("derivative", [0, 1, 2])
+def test_sav_gol_same_as_savgol_filter(window_size, polyorder, derivative):
+    Y = _get_signals()
+    expected = savgol_filter(Y, window_size, polyorder, deriv=derivative, delta=0.5, axis=-1, mode="interp")
+
+    result = Preprocessor.filter.sav_gol(
+        y=Y, window_size=window_size, polyorder=polyorder, derivative=derivative, delta=0.5)
+    result_row = Preprocessor.filter.sav_gol(
+        y=Y[0], window_size=window_size, polyorder=polyorder, derivative=derivative, delta=0.5)
+    # Uniform x-axis with the same spacing
+    result_x = Preprocessor.filter.sav_gol(
+        y=Y, window_size=window_size, polyorder=polyorder, derivative=derivative, x=np.arange(Y.shape[1]) * 0.5)
+
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(result_row, expected[0], rtol=0, atol=1e-10)
+    np.testing.assert_allclose(result_x, expected, rtol=0, atol=1e-10)
+
+
+@pytest.mark.parametrize("derivative", [0, 1, 2])
+def test_sav_gol_non_uniform_x(derivative):
+    Y = _get_signals()
+    rng = np.random.default_rng(1)
+    # Axis shared by all the signals and per-row axes
+    x = np.cumsum(rng.uniform(0.5, 1.5, size=Y.shape[1]))
+    X = np.cumsum(rng.uniform(0.5, 1.5, size=Y.shape), axis=1)
+
+    result = Preprocessor.filter.sav_gol(y=Y, window_size=11, polyorder=3, derivative=derivative, x=x)
+    result_rows = Preprocessor.filter.sav_gol(y=Y, window_size=11, polyorder=3, derivative=derivative, x=X)
+
+    expected = np.stack([_savgol_reference(y, x, 11, 3, derivative) for y in Y])
+    expected_rows = np.stack([_savgol_reference(y, x_row, 11, 3, derivative) for y, x_row in zip(Y, X)])
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(result_rows, expected_rows, rtol=0, atol=1e-9)